@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Adaptive (AIMD) concurrency control for AI Voices
+
+Adjusts the number of in-flight jobs at runtime: while the upstream looks
+healthy the limit grows by one job per "round" (one limit's worth of
+completions); on 429/5xx responses, long queue positions or inflated
+completion latency it is cut multiplicatively, at most once per cooldown.
+
+The controller only observes responses while installed (see install());
+otherwise record_response() and record_queue_position() are no-ops.
+"""
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from hedging import percentile
+
+_controller = None
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease limit on in-flight jobs.
+
+    Args:
+        initial: Starting limit
+        minimum: Lowest limit
+        maximum: Highest limit
+        increase: Jobs added per round of healthy completions
+        decrease: Factor applied to the limit under pressure
+        queue_threshold: queue_position above which the upstream counts as saturated
+        latency_factor: Smoothed completion latency above this multiple of
+            the baseline (10th percentile of recent completions) counts as pressure
+        log: Callable receiving one dict per decision
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=64, increase=1.0, decrease=0.5,
+                 queue_threshold=4, latency_factor=2.0, log=None):
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.queue_threshold = queue_threshold
+        self.latency_factor = latency_factor
+        self.log = log
+
+        self.in_flight = 0
+        self.decisions = []
+        self._cond = threading.Condition()
+        self._start = time.time()
+        self._last_decrease = 0.0
+        self._recent_latencies = deque(maxlen=50)
+        self._base_latency = None
+        self._latency = None
+        self._signals = {"errors": 0, "responses": 0, "max_queue_position": 0}
+
+    # ------------------------------------------------------------------
+    # Limiting
+
+    def acquire(self):
+        """Block until the job fits under the current limit"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        return time.time()
+
+    def try_acquire(self):
+        """Take a slot only if the limit allows it now. Returns the start time, or None."""
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                return None
+            self.in_flight += 1
+        return time.time()
+
+    def release(self, started, completed=True):
+        """Finish a job started at the time returned by acquire()
+
+        completed=False gives the slot back without counting a completion
+        (e.g. a cancelled duplicate), so it does not feed the latency signal.
+        """
+        latency = time.time() - started
+        with self._cond:
+            self.in_flight -= 1
+            if completed:
+                self._on_complete(latency)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=None):
+        """Hold an in-flight slot for the duration of a with-block"""
+        started = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(started)
+
+    # ------------------------------------------------------------------
+    # Signals
+
+    def record_response(self, status_code):
+        """Observe one upstream HTTP status code"""
+        with self._cond:
+            self._signals["responses"] += 1
+            if status_code == 429 or status_code >= 500:
+                self._signals["errors"] += 1
+                # Rate limiting is the clearest signal - react without waiting for a completion
+                self._maybe_decrease(f"http {status_code}")
+
+    def record_queue_position(self, position):
+        """Observe a queue_position reported by a status check"""
+        with self._cond:
+            self._signals["max_queue_position"] = max(self._signals["max_queue_position"], position or 0)
+
+    def _on_complete(self, latency):
+        # Called with the lock held
+        # A low percentile rather than the minimum, so one lucky job (or the
+        # granularity of status polling) does not make every later job look slow
+        self._recent_latencies.append(latency)
+        if len(self._recent_latencies) >= 10:
+            self._base_latency = percentile(list(self._recent_latencies), 10)
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+
+        if self._signals["max_queue_position"] > self.queue_threshold:
+            self._maybe_decrease(f"queue_position {self._signals['max_queue_position']}")
+        elif self._base_latency and self._latency > self.latency_factor * self._base_latency:
+            self._maybe_decrease(f"latency {self._latency:.1f}s (baseline {self._base_latency:.1f}s)")
+        else:
+            self._set_limit(self.limit + self.increase / max(1.0, self.limit), "healthy")
+
+    def _maybe_decrease(self, reason):
+        # One cut per cooldown (roughly one completion latency), so a burst
+        # of errors caused by a single overshoot only halves the limit once
+        now = time.time()
+        cooldown = self._latency or 1.0
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self._set_limit(self.limit * self.decrease, reason)
+        self._signals["max_queue_position"] = 0
+
+    def _set_limit(self, limit, reason):
+        old = int(self.limit)
+        self.limit = max(float(self.minimum), min(float(self.maximum), limit))
+        if int(self.limit) == old:
+            return
+        decision = {
+            "t": round(time.time() - self._start, 3),
+            "limit": int(self.limit),
+            "previous": old,
+            "reason": reason,
+            "in_flight": self.in_flight,
+            "latency": round(self._latency, 3) if self._latency is not None else None,
+            **self._signals,
+        }
+        self.decisions.append(decision)
+        if self.log:
+            self.log(decision)
+        self._cond.notify_all()
+
+    def report(self):
+        """Return a short summary of the controller's behaviour"""
+        with self._cond:
+            limits = [d["limit"] for d in self.decisions] or [int(self.limit)]
+            recent = limits[-10:]
+            return (
+                f"📈 Adaptive concurrency: final limit {int(self.limit)}, "
+                f"recent range {min(recent)}-{max(recent)}, {len(self.decisions)} changes, "
+                f"{self._signals['errors']}/{self._signals['responses']} throttled or failed responses"
+            )
+
+
+def stderr_log(decision):
+    """Default decision log: one JSON line per decision on stderr"""
+    print(f"📈 AIMD {json.dumps(decision)}", file=sys.stderr)
+
+
+def install(controller):
+    """Route upstream responses observed by main.py to a controller"""
+    global _controller
+    _controller = controller
+    return controller
+
+
+def record_response(status_code):
+    if _controller is not None:
+        _controller.record_response(status_code)
+
+
+def record_queue_position(position):
+    if _controller is not None:
+        _controller.record_queue_position(position)
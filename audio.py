@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+MP3 helpers for AI Voices
+
+Concatenates generated clips without decoding them: MP3 is a stream of
+self-contained frames, so clips can be joined once their ID3 tags and
+Xing/Info/VBRI header frames (which describe one clip's duration and seek
+table) are removed. Silence is made of MPEG Layer III frames with empty
+side info, which decode to zero samples, in the same format as the clips
+around it.
+"""
+import tracing
+
+# Layer III bitrates (kbps) by bitrate index, and sample rates by version
+_BITRATES = {
+    "1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+# MPEG-1 Layer III, 128 kbps, 32 kHz, mono - the API's default output
+DEFAULT_HEADER = b"\xff\xfb\x98\xc0"
+
+
+def _id3v2_size(data):
+    """Length of a leading ID3v2 tag, or 0"""
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    # Tag size is a 28-bit "syncsafe" integer; flag 0x10 means a 10-byte footer follows
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+def _strip_id3(data):
+    """Remove a leading ID3v2 tag and a trailing ID3v1 tag from MP3 bytes"""
+    data = data[_id3v2_size(data):]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+def _strip_vbr_header(data):
+    """
+    Remove a Xing, Info or VBRI header frame from MP3 bytes (keeping any ID3v2 tag).
+
+    Encoders put it in place of the first audio frame; it holds the frame
+    count and seek table of that one clip, so a joined file keeping it would
+    report the first clip's duration for the whole track.
+    """
+    start = _id3v2_size(data)
+    for offset in range(start, min(len(data) - 3, start + 4096)):
+        header = data[offset:offset + 4]
+        frame = parse_frame_header(header)
+        if frame is None:
+            continue
+        mono = header[3] >> 6 == 3
+        side_info = (17 if mono else 32) if (header[1] >> 3) & 3 == 3 else (9 if mono else 17)
+        crc = 0 if header[1] & 1 else 2
+        xing_at = offset + 4 + crc + side_info
+        if data[xing_at:xing_at + 4] in (b"Xing", b"Info") or data[offset + 36:offset + 40] == b"VBRI":
+            return data[:offset] + data[offset + frame["frame_size"]:]
+        return data
+    return data
+
+
+def parse_frame_header(header):
+    """
+    Parse a 4-byte MPEG Layer III frame header.
+
+    Returns:
+        dict: frame_size, samples and sample_rate, or None if not a Layer III header
+    """
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 3
+    layer = (header[1] >> 1) & 3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    bitrate = _BITRATES["1" if version == 3 else "2"][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 1
+    coefficient = 144 if version == 3 else 72
+    return {
+        "frame_size": coefficient * bitrate // sample_rate + padding,
+        "samples": 1152 if version == 3 else 576,
+        "sample_rate": sample_rate,
+    }
+
+
+def first_frame_header(data):
+    """Return the header of the first frame of an MP3 clip, or DEFAULT_HEADER"""
+    data = _strip_id3(data)
+    for offset in range(min(len(data) - 3, 4096)):
+        if parse_frame_header(data[offset:offset + 4]):
+            return data[offset:offset + 4]
+    return DEFAULT_HEADER
+
+
+def count_frames(data, header=None):
+    """
+    Count the frames of an MP3 clip.
+
+    If the frames cannot be walked (corrupt or non-MP3 data), the count is
+    estimated from the size and the frame size of header. A Xing/Info/VBRI
+    header frame is not counted, since it holds no audio.
+    """
+    data = _strip_vbr_header(_strip_id3(data))
+    offset = 0
+    frames = 0
+    while offset + 4 <= len(data):
+        frame = parse_frame_header(data[offset:offset + 4])
+        if frame is None:
+            frame_size = parse_frame_header(header or DEFAULT_HEADER)["frame_size"]
+            return round(len(data) / frame_size)
+        offset += frame["frame_size"]
+        frames += 1
+    return frames
+
+
+def frames_for(seconds, header=DEFAULT_HEADER):
+    """Number of frames closest to a duration in seconds"""
+    frame = parse_frame_header(header)
+    return round(seconds * frame["sample_rate"] / frame["samples"])
+
+
+def silent_frames(count, header=DEFAULT_HEADER):
+    """
+    Return count frames of silence in the format of header.
+
+    Padding and CRC are switched off, and the side info and main data are
+    all zeros, so every frame decodes to silence.
+    """
+    header = bytes([header[0], header[1] | 0x01, header[2] & ~0x02, header[3]])
+    frame_size = parse_frame_header(header)["frame_size"]
+    return (header + bytes(frame_size - 4)) * count
+
+
+def write_mp3(parts, output_path):
+    """
+    Write MP3 byte strings (clips or silence) as one file.
+
+    The first part keeps its ID3 tag; tags are stripped from the rest so
+    players don't stop or glitch at clip boundaries. Xing/Info/VBRI header
+    frames are dropped from every part, so players measure the duration of
+    the whole file instead of trusting the first clip's header.
+
+    Returns:
+        int: Size of the written file in bytes
+    """
+    size = 0
+    with open(output_path, "wb") as out:
+        for index, data in enumerate(parts):
+            if index > 0:
+                data = _strip_id3(data)
+            data = _strip_vbr_header(data)
+            out.write(data)
+            size += len(data)
+    return size
+
+
+@tracing.traced("concat")
+def concat_mp3(paths, output_path):
+    """
+    Join MP3 clips into one file.
+
+    Returns:
+        int: Size of the written file in bytes
+    """
+    parts = []
+    for path in paths:
+        with open(path, "rb") as f:
+            parts.append(f.read())
+    return write_mp3(parts, output_path)
@@ -0,0 +1,826 @@
+#!/usr/bin/env python3
+"""
+Embeddable speech generation API for AI Voices
+
+SpeechClient runs text-to-speech jobs against the fal.ai queue in-process:
+submit, wait (polling, hedged polling, webhooks or a shared StatusPoller),
+fetch the result and download the audio. It never prints and never exits
+the interpreter: progress goes to an on_progress callback as event dicts,
+and failures raise SpeechError subclasses. main.py, rich_version.py,
+textual_version.py and previews.py are all front-ends over it.
+
+    client = SpeechClient(api_key)
+    job = client.submit("Hello world", "Wise_Woman", "hello.mp3", on_progress=print)
+    job.result()
+
+The transport (anything with a requests.Session-style request() method)
+and the executor running submitted jobs can be passed in.
+
+Progress events all carry an "event" key:
+
+    filename          output             auto-generated output file name
+    preprocessed      text, tone_list, replacements, ms  text after canonicalization and the dictionary
+    cache_hit         destination, bytes audio reused from the result cache
+    submitting        text, voice_id
+    retry             status_code, delay upstream busy, retrying
+    submitted         request_id, status_url, ack_ms
+    waiting           request_id, mode ("poll", "hedge", "webhook" or "poller"), interval
+    queued            request_id, queue_position
+    in_progress       request_id
+    hedged            request_id, elapsed, threshold   duplicate submitted
+    hedge_cancelled   request_id                       slower copy cancelled
+    completed         request_id, elapsed, via
+    fetching_result   url
+    result_retry      url, status_code                 trying an alternative URL
+    downloading       url, destination
+    download_progress bytes, total                     total is None if unknown
+    downloaded        destination, bytes
+"""
+import contextlib
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+import aimd
+import tracing
+from preprocess import TextPreprocessor
+
+# Queue API base URL - override with FAL_QUEUE_URL to target a local fake (see fake_queue.py)
+QUEUE_URL = os.environ.get("FAL_QUEUE_URL", "https://queue.fal.run").rstrip("/")
+MODEL_ID = "fal-ai/minimax/speech-02-hd"
+MAX_TEXT_CHARS = 5000
+
+# Upstream responses worth retrying (rate limited or temporarily unavailable)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# A submit is only retried when the queue certainly did not accept it: other
+# 5xx responses and gateway timeouts may still have enqueued a paid job
+SUBMIT_RETRY_STATUS_CODES = {429, 503}
+MAX_RETRIES = 5
+
+# Default transport shared by every client, so connections (including ones
+# pre-warmed while the user is typing) are reused instead of reopened
+SESSION = requests.Session()
+SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=64))
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=64))
+
+
+class SpeechError(Exception):
+    """Base class of every error raised by SpeechClient"""
+
+    def __init__(self, message, status_code=None, response_text=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response_text = response_text
+
+
+class SubmitError(SpeechError):
+    """The queue rejected or never received a submission"""
+
+
+class StatusError(SpeechError):
+    """A status check failed or returned an unknown status"""
+
+
+class JobFailed(SpeechError):
+    """The queue reported the request as failed"""
+
+
+class ResultError(SpeechError):
+    """The result could not be fetched or has no audio URL"""
+
+
+class DownloadError(SpeechError):
+    """The audio could not be downloaded"""
+
+
+class JobCancelled(SpeechError):
+    """The job was cancelled through its SpeechJob handle"""
+
+
+def validate_text(text):
+    """Raise ValueError unless text can be sent in one request"""
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("Empty text provided")
+    if len(text) > MAX_TEXT_CHARS:
+        raise ValueError(f"Text too long ({len(text)} characters). Maximum is {MAX_TEXT_CHARS}.")
+
+
+def generate_filename(voice_id, display_name, text, default_output="output.mp3"):
+    """Generate a filename based on voice and text with naming convention.
+
+    Format: For custom voices: {display_name}-{YYYY-MM-DD}-{text}.mp3
+            For built-in voices: {voice_id}-{YYYY-MM-DD}-{text}.mp3
+    Maximum filename length: 100 characters
+    """
+    # Get current date
+    date_str = datetime.now().strftime("%Y-%m-%d")
+
+    # Use display name for custom voices, voice_id for built-in voices
+    if display_name != voice_id:
+        # This is a custom voice - use the display name (sanitized)
+        voice_identifier = "".join(c if c.isalnum() else "_" for c in display_name.lower())
+    else:
+        # This is a built-in voice - use the voice ID (sanitized)
+        voice_identifier = "".join(c if c.isalnum() else "_" for c in voice_id.lower())
+
+    # Sanitize text for filename
+    # Remove or replace special characters, keep alphanumeric and spaces
+    safe_text = "".join(c if c.isalnum() or c in (" ", "-", "_") else "_" for c in text)
+
+    # Replace multiple spaces/underscores with single underscore
+    safe_text = re.sub(r"[_\s]+", "_", safe_text)
+
+    # Remove leading/trailing underscores
+    safe_text = safe_text.strip("_")
+
+    # Calculate available space for text
+    # Format: {voice_identifier}-{date}-{text}.mp3
+    # voice_identifier + "-" + date + "-" + text + ".mp3"
+    # 100 max total
+    date_part = len(date_str)  # YYYY-MM-DD = 10 chars
+    extension_part = 4  # .mp3 = 4 chars
+    separators = 2  # two hyphens
+    voice_part = len(voice_identifier)
+
+    # Available for text
+    available_for_text = 100 - date_part - extension_part - separators - voice_part
+
+    # Ensure we have at least some text
+    if available_for_text < 1:
+        # Voice identifier is too long, truncate it
+        max_voice_len = 100 - date_part - extension_part - separators - 1
+        voice_identifier = voice_identifier[:max_voice_len]
+        available_for_text = 100 - date_part - extension_part - separators - len(voice_identifier)
+
+    # Truncate text if needed
+    if len(safe_text) > available_for_text:
+        safe_text = safe_text[:available_for_text].rstrip("_")
+
+    # Construct filename
+    filename = f"{voice_identifier}-{date_str}-{safe_text}.mp3"
+
+    return filename
+
+
+def describe_event(event):
+    """One-line status for a progress event (for UIs), or None for events not worth showing"""
+    kind = event["event"]
+    if kind == "submitting":
+        return "Submitting request..."
+    if kind == "retry":
+        return f"Upstream busy, retrying in {event['delay']:.0f}s..."
+    if kind == "submitted":
+        return f"Submitted in {event['ack_ms']:.0f} ms, waiting for the queue..."
+    if kind == "queued":
+        return f"In queue, position {event['queue_position']}..."
+    if kind == "in_progress":
+        return "Generating speech..."
+    if kind == "completed":
+        return f"Completed in {event['elapsed']:.1f}s, fetching audio..."
+    if kind == "download_progress":
+        return f"Downloading... {event['bytes'] / 1024:.0f} KB"
+    if kind == "cache_hit":
+        return "Reused cached audio"
+    return None
+
+
+def _emit(on_progress, event, **fields):
+    if on_progress is not None:
+        on_progress({"event": event, **fields})
+
+
+def _destination(output):
+    return getattr(output, "name", "<stream>") if hasattr(output, "write") else output
+
+
+def _cancel_url(status_url):
+    return status_url.rsplit("/status", 1)[0] + "/cancel"
+
+
+class SpeechJob:
+    """
+    Handle of a job started with SpeechClient.submit().
+
+    Wraps the job's Future; request_id and status_url are set once the
+    queue accepted it. A handle created directly (without a Future) can be
+    passed to generate() or generate_async() to make that call cancellable.
+    """
+
+    def __init__(self):
+        self.future = None
+        self.request_id = None
+        self.status_url = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """
+        Stop the job. A job still waiting for the executor never starts
+        (result() raises CancelledError); a running one is cancelled upstream
+        at its next status check and result() raises JobCancelled.
+
+        Returns:
+            bool: False if the job had already finished
+        """
+        if self.future is not None:
+            if self.future.done():
+                return False
+            self.future.cancel()
+        self._cancel.set()
+        return True
+
+    def result(self, timeout=None):
+        """Wait for the job. Returns the output path or raises its SpeechError."""
+        return self.future.result(timeout)
+
+    def done(self):
+        return self.future.done()
+
+    def add_done_callback(self, fn):
+        """Call fn(job) when the job finishes"""
+        self.future.add_done_callback(lambda future: fn(self))
+
+
+class SpeechClient:
+    """
+    Text-to-speech jobs against the fal.ai queue.
+
+    Args:
+        api_key: fal.ai API key
+        transport: Object with a requests.Session-style request(method, url, **kwargs)
+            (default: a Session shared by every client)
+        executor: concurrent.futures.Executor running submit()ted jobs
+            (default: 4 threads, created on first use)
+        queue_url: Queue API base URL
+        model_id: Model endpoint on the queue
+        job_slot: Callable(priority) returning a context manager held for each
+            generate() call, e.g. scheduler.env_slot (default: none)
+        preprocessor: preprocess.TextPreprocessor run on every text before it is
+            looked up in the cache or submitted (default: canonicalization only)
+    """
+
+    def __init__(self, api_key, transport=None, executor=None, queue_url=QUEUE_URL, model_id=MODEL_ID,
+                 job_slot=None, preprocessor=None):
+        self.api_key = api_key
+        self.transport = transport or SESSION
+        self.job_slot = job_slot or (lambda priority: contextlib.nullcontext())
+        self.preprocessor = preprocessor or TextPreprocessor()
+        self.queue_url = queue_url.rstrip("/")
+        self.model_id = model_id
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speech")
+            return self._executor
+
+    def close(self):
+        """Shut down the default executor, if one was created"""
+        with self._executor_lock:
+            if self._owns_executor and self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _headers(self):
+        return {"Authorization": f"Key {self.api_key}"}
+
+    def _request(self, method, url, error, max_retries=MAX_RETRIES, on_progress=None,
+                 retry_statuses=RETRY_STATUS_CODES, **kwargs):
+        """Send a request, retrying rate-limited and 5xx responses with backoff.
+
+        Every response is reported to the adaptive concurrency controller (if
+        one is installed), so throttling shrinks the number of in-flight jobs.
+        Transport failures are raised as the given SpeechError subclass.
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                response = self.transport.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                raise error(f"Request to {url} failed: {e}") from e
+            aimd.record_response(response.status_code)
+
+            if response.status_code not in retry_statuses or attempt == max_retries:
+                return response
+
+            delay = min(30, 2 ** attempt) * random.uniform(0.5, 1.0)
+            _emit(on_progress, "retry", status_code=response.status_code, delay=delay)
+            time.sleep(delay)
+
+    # ------------------------------------------------------------------
+    # Queue API
+
+    @tracing.traced("submit")
+    def submit_request(self, text, voice_id, webhook_url=None, on_progress=None, tone_list=None):
+        """Submit a text-to-speech request. Returns (request_id, status_url).
+
+        tone_list entries ("term/pronunciation") are sent as the request's
+        pronunciation dictionary.
+        """
+        url = f"{self.queue_url}/{self.model_id}"
+
+        payload = {
+            "text": text,
+            "voice_setting": {
+                "voice_id": voice_id
+            },
+            "output_format": "url"  # Get URL instead of hex
+        }
+        if tone_list:
+            payload["pronunciation_dict"] = {"tone_list": tone_list}
+
+        _emit(on_progress, "submitting", text=text, voice_id=voice_id)
+        started = time.perf_counter()
+
+        params = {"fal_webhook": webhook_url} if webhook_url else None
+
+        response = self._request(
+            "POST", url, SubmitError, on_progress=on_progress, retry_statuses=SUBMIT_RETRY_STATUS_CODES,
+            headers={**self._headers(), "Content-Type": "application/json"}, json=payload, params=params,
+        )
+
+        if response.status_code != 200:
+            raise SubmitError(f"Error submitting request: {response.status_code}", response.status_code, response.text)
+
+        result = response.json()
+        request_id = result.get("request_id")
+        status_url = result.get("status_url")
+
+        _emit(on_progress, "submitted", request_id=request_id, status_url=status_url,
+              ack_ms=1000 * (time.perf_counter() - started))
+        return request_id, status_url
+
+    @tracing.traced("status_poll")
+    def check_status(self, status_url, max_retries=3):
+        """Check the status of a request. Returns the status data."""
+        response = self._request("GET", status_url, StatusError, max_retries=max_retries, headers=self._headers())
+
+        # 202 is a normal response for async operations (IN_QUEUE or IN_PROGRESS)
+        if response.status_code not in [200, 202]:
+            raise StatusError(f"Error checking status: {response.status_code}", response.status_code, response.text)
+
+        status_data = response.json()
+        aimd.record_queue_position(status_data.get("queue_position"))
+        return status_data
+
+    @tracing.traced("cancel")
+    def cancel_request(self, cancel_url):
+        """Cancel a queued or running request. Returns True if it was cancelled."""
+        try:
+            response = self.transport.request("PUT", cancel_url, headers=self._headers())
+        except requests.RequestException:
+            return False
+
+        if response.status_code != 200:
+            return False
+
+        return bool(response.json().get("success"))
+
+    def cancel_job(self, handle):
+        """
+        Cancel a job through its handle and, if it was already submitted,
+        upstream right away instead of at its next status check.
+
+        Returns:
+            bool: True if the upstream request was cancelled
+        """
+        handle.cancel()
+        if handle.status_url is None:
+            return False
+        return self.cancel_request(_cancel_url(handle.status_url))
+
+    @tracing.traced("result_fetch")
+    def get_result(self, response_url, on_progress=None):
+        """Get the final result of a request"""
+        _emit(on_progress, "fetching_result", url=response_url)
+
+        response = self._request("GET", response_url, ResultError, max_retries=0, headers=self._headers())
+
+        if response.status_code != 200:
+            # Try alternative URL patterns
+            if "/queue/" not in response_url:
+                raise ResultError(f"Error getting result: {response.status_code}", response.status_code, response.text)
+
+            # Try without /queue/
+            alt_url = response_url.replace("/queue/", "/")
+            _emit(on_progress, "result_retry", url=alt_url, status_code=response.status_code)
+            response = self._request("GET", alt_url, ResultError, max_retries=0, headers=self._headers())
+
+            if response.status_code != 200:
+                raise ResultError(f"Error getting result: {response.status_code}", response.status_code, response.text)
+
+        return response.json()
+
+    @tracing.traced("download")
+    def download_audio(self, audio_url, output, chunk_size=64 * 1024, capture=False, on_progress=None):
+        """Download the audio file.
+
+        The response is streamed chunk by chunk rather than buffered in memory.
+        A path is written as <output>.part and renamed once the whole body
+        has arrived, so a dropped connection never leaves a truncated file
+        that looks finished. output may also be a binary file object (e.g.
+        stdout), which receives each chunk as soon as it arrives. With
+        capture=True the downloaded bytes are also returned (for the result cache).
+        """
+        to_stream = hasattr(output, "write")
+        destination = _destination(output)
+        _emit(on_progress, "downloading", url=audio_url, destination=destination)
+
+        response = self._request("GET", audio_url, DownloadError, max_retries=0, stream=True)
+
+        if response.status_code != 200:
+            # Release the pooled connection the streamed response holds
+            response.close()
+            raise DownloadError(f"Error downloading file: {response.status_code}", response.status_code)
+
+        total = response.headers.get("Content-Length")
+        total = int(total) if total and total.isdigit() else None
+        file_size = 0
+        captured = [] if capture else None
+
+        def write_chunks(f):
+            nonlocal file_size
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+                if to_stream:
+                    f.flush()
+                file_size += len(chunk)
+                if capture:
+                    captured.append(chunk)
+                _emit(on_progress, "download_progress", bytes=file_size, total=total)
+
+        try:
+            with response:
+                if to_stream:
+                    write_chunks(output)
+                else:
+                    # Create directory if it doesn't exist
+                    os.makedirs(os.path.dirname(output) if os.path.dirname(output) else ".", exist_ok=True)
+                    partial = f"{output}.part"
+                    try:
+                        with open(partial, "wb") as f:
+                            write_chunks(f)
+                        if total is not None and file_size != total:
+                            raise DownloadError(f"Download of {audio_url} ended after {file_size} of {total} bytes")
+                        os.replace(partial, output)
+                    except BaseException:
+                        with contextlib.suppress(OSError):
+                            os.remove(partial)
+                        raise
+        except requests.RequestException as e:
+            raise DownloadError(f"Download of {audio_url} failed: {e}") from e
+
+        _emit(on_progress, "downloaded", destination=destination, bytes=file_size)
+        return b"".join(captured) if capture else None
+
+    # ------------------------------------------------------------------
+    # Waiting for completion
+
+    def _track(self, status_data, request_id, on_progress):
+        """Report one status check. Returns True once the request completed."""
+        status = status_data.get("status")
+        if status == "COMPLETED":
+            return True
+        if status == "IN_QUEUE":
+            _emit(on_progress, "queued", request_id=request_id, queue_position=status_data.get("queue_position", 0))
+        elif status == "IN_PROGRESS":
+            _emit(on_progress, "in_progress", request_id=request_id)
+        else:
+            raise StatusError(f"Unknown status: {status}")
+        return False
+
+    def _check_cancelled(self, handle, request_id, status_url, cancel_url=None):
+        if handle is None or not handle.cancelled:
+            return
+        self.cancel_request(cancel_url or _cancel_url(status_url))
+        raise JobCancelled(f"Request {request_id} cancelled")
+
+    def poll_until_complete(self, request_id, status_url, poll_interval=2, on_progress=None, handle=None):
+        """Poll the status URL until the request is complete"""
+        _emit(on_progress, "waiting", request_id=request_id, mode="poll", interval=poll_interval)
+
+        start_time = time.time()
+
+        while True:
+            status_data = self.check_status(status_url)
+
+            if self._track(status_data, request_id, on_progress):
+                _emit(on_progress, "completed", request_id=request_id, elapsed=time.time() - start_time, via="poll")
+                return status_data
+
+            self._check_cancelled(handle, request_id, status_url, status_data.get("cancel_url"))
+            time.sleep(poll_interval)
+
+    def poll_with_hedge(self, text, voice_id, request_id, status_url, hedger, poll_interval=2,
+                        on_progress=None, handle=None, tone_list=None):
+        """Poll like poll_until_complete, hedging slow requests with a duplicate.
+
+        Once the request has been running longer than the hedger's latency
+        threshold (and the hedge budget allows it), the same text is submitted
+        again. Whichever copy completes first wins and the other is cancelled.
+        """
+        _emit(on_progress, "waiting", request_id=request_id, mode="hedge", interval=poll_interval)
+
+        start_time = time.time()
+        hedger.job_started()
+        threshold = hedger.threshold()
+        copies = [{"request_id": request_id, "status_url": status_url, "cancel_url": None, "open": True}]
+        extra_requests = 0
+        release_slot = None
+
+        try:
+            while True:
+                for index, copy in enumerate(copies):
+                    status_data = self.check_status(copy["status_url"])
+                    if index > 0:
+                        extra_requests += 1
+
+                    copy["cancel_url"] = status_data.get("cancel_url") or copy["cancel_url"]
+
+                    if self._track(status_data, copy["request_id"], on_progress):
+                        copy["open"] = False
+                        elapsed = time.time() - start_time
+                        _emit(on_progress, "completed", request_id=copy["request_id"], elapsed=elapsed,
+                              via="duplicate" if index > 0 else "original")
+
+                        for loser in copies:
+                            if not loser["open"]:
+                                continue
+                            loser["open"] = False
+                            self.cancel_request(loser["cancel_url"] or _cancel_url(loser["status_url"]))
+                            extra_requests += 1
+                            _emit(on_progress, "hedge_cancelled", request_id=loser["request_id"])
+
+                        hedger.record(elapsed, hedge_won=index > 0)
+                        return status_data
+
+                if handle is not None and handle.cancelled:
+                    raise JobCancelled(f"Request {request_id} cancelled")
+
+                elapsed = time.time() - start_time
+                if len(copies) == 1 and threshold is not None and elapsed >= threshold:
+                    # The duplicate takes its own concurrency slot; without a free one, don't hedge
+                    release_slot = hedger.try_acquire()
+                if len(copies) == 1 and release_slot:
+                    hedge_id, hedge_status_url = self.submit_request(text, voice_id, tone_list=tone_list)
+                    extra_requests += 1
+                    copies.append({"request_id": hedge_id, "status_url": hedge_status_url, "cancel_url": None,
+                                   "open": True})
+                    _emit(on_progress, "hedged", request_id=hedge_id, elapsed=elapsed, threshold=threshold)
+
+                time.sleep(poll_interval)
+        finally:
+            # A cancelled job, failed status check or failed submission must not
+            # leave a paid copy running upstream
+            for copy in copies:
+                if copy["open"]:
+                    self.cancel_request(copy["cancel_url"] or _cancel_url(copy["status_url"]))
+                    if len(copies) > 1:
+                        extra_requests += 1
+            if release_slot:
+                release_slot()
+            hedger.add_requests(extra_requests)
+
+    def wait_for_webhook(self, request_id, status_url, receiver, fallback_interval=30, on_progress=None,
+                         handle=None):
+        """Wait for the completion webhook of a request.
+
+        The status URL is only polled every fallback_interval seconds, to catch
+        webhooks that never arrive. Returns status data; when the webhook
+        delivered the result, it is included under the "result" key.
+        """
+        _emit(on_progress, "waiting", request_id=request_id, mode="webhook", interval=fallback_interval)
+        receiver.expect(request_id)
+
+        # However the wait ends, stop expecting the request, so a dead job's
+        # late webhook is never held for it
+        try:
+            start_time = time.time()
+            next_check = start_time + fallback_interval
+
+            while True:
+                # A cancellable job wakes up every second to notice cancel()
+                timeout = max(0.0, next_check - time.time())
+                if handle is not None:
+                    timeout = min(timeout, 1.0)
+                with tracing.span("webhook_wait"):
+                    event = receiver.wait(request_id, timeout)
+
+                if event is not None:
+                    if event.get("status") != "OK":
+                        raise JobFailed(f"Request failed: {event.get('error') or event.get('payload')}")
+                    _emit(on_progress, "completed", request_id=request_id, elapsed=time.time() - start_time,
+                          via="webhook")
+                    return {"status": "COMPLETED", "request_id": request_id, "result": event.get("payload")}
+
+                self._check_cancelled(handle, request_id, status_url)
+                if time.time() < next_check:
+                    continue
+                next_check = time.time() + fallback_interval
+
+                status_data = self.check_status(status_url)
+
+                if self._track(status_data, request_id, on_progress):
+                    # The webhook may have raced the status check - prefer its payload
+                    event = receiver.pop(request_id)
+                    if event is not None and event.get("status") == "OK":
+                        status_data["result"] = event.get("payload")
+                    _emit(on_progress, "completed", request_id=request_id, elapsed=time.time() - start_time,
+                          via="fallback")
+                    return status_data
+        finally:
+            receiver.pop(request_id)
+
+    # ------------------------------------------------------------------
+    # Jobs
+
+    def _cached_audio(self, cache, text, voice_id, tone_list=None):
+        """Look a job up in the result cache. Returns (key, audio bytes or None)."""
+        from result_cache import cache_key
+
+        settings = {"model": self.model_id}
+        if tone_list:
+            settings["tone_list"] = tone_list
+        key = cache_key(text, voice_id, settings)
+        with tracing.span("cache_lookup"):
+            return key, cache.get(key)
+
+    def _write_cached(self, data, output, on_progress):
+        """Write audio taken from the result cache to a path or binary file object"""
+        if hasattr(output, "write"):
+            output.write(data)
+            output.flush()
+        else:
+            os.makedirs(os.path.dirname(output) if os.path.dirname(output) else ".", exist_ok=True)
+            with open(output, "wb") as f:
+                f.write(data)
+        _emit(on_progress, "cache_hit", destination=_destination(output), bytes=len(data))
+
+    def fetch_and_download(self, status_data, output, cache=None, key=None, on_progress=None):
+        """Fetch the result of a completed request and download its audio"""
+        result = status_data.get("result")
+        if not result:
+            # Get the response_url from the final status
+            response_url = status_data.get("response_url")
+            if not response_url:
+                raise ResultError("No response_url in status data")
+
+            result = self.get_result(response_url, on_progress)
+
+        audio_url = result.get("audio", {}).get("url")
+        if not audio_url:
+            raise ResultError("No audio URL in response")
+
+        data = self.download_audio(audio_url, output, capture=cache is not None, on_progress=on_progress)
+        if cache:
+            with tracing.span("cache_store"):
+                cache.put(key, data)
+
+        return output
+
+    def _prepare(self, text, on_progress):
+        """Run the preprocessor. Returns (text to submit, tone_list)."""
+        validate_text(text)
+        with tracing.span("preprocess"):
+            spoken, tone_list, stats = self.preprocessor(text)
+        _emit(on_progress, "preprocessed", text=spoken, tone_list=tone_list, **stats)
+        validate_text(spoken)
+        return spoken, tone_list
+
+    def _output_for(self, output, voice_id, display_name, text, on_progress):
+        if output is None:
+            output = generate_filename(voice_id, display_name or voice_id, text)
+            _emit(on_progress, "filename", output=output)
+        return output
+
+    def generate(self, text, voice_id, output=None, display_name=None, poll_interval=2, receiver=None,
+                 fallback_interval=30, hedger=None, cache=None, on_progress=None, handle=None,
+                 priority="normal"):
+        """Run one text-to-speech job end to end and return the output path.
+
+        Args:
+            text: Text to speak
+            voice_id: Voice ID (see voices.resolve_voice_id for names)
+            output: Output path or binary file object (default: generate_filename())
+            display_name: Voice name used in the default file name
+            poll_interval: Seconds between status checks
+            receiver: WebhookReceiver - wait for completion webhooks instead of polling,
+                checking the status URL only every fallback_interval seconds
+            hedger: Hedger - race slow polled jobs against a duplicate submission
+            cache: TieredCache - reuse audio generated before for the same text,
+                voice, model and pronunciations, and store new audio
+            on_progress: Callable receiving progress event dicts
+            handle: SpeechJob to record the request ID on and check for cancellation
+            priority: Scheduling class passed to the client's job_slot
+
+        Raises:
+            ValueError: If the text is empty or too long
+            SpeechError: If any stage of the job fails
+        """
+        validate_text(text)
+        display_name = display_name or voice_id
+        output = self._output_for(output, voice_id, display_name, text, on_progress)
+
+        with self.job_slot(priority), tracing.job(f"{display_name}: {text[:40]}"):
+            spoken, tone_list = self._prepare(text, on_progress)
+            key = None
+            if cache:
+                key, data = self._cached_audio(cache, spoken, voice_id, tone_list)
+                if data is not None:
+                    self._write_cached(data, output, on_progress)
+                    return output
+
+            if handle is not None and handle.cancelled:
+                raise JobCancelled("Cancelled before submission")
+
+            webhook_url = receiver.url if receiver else None
+            request_id, status_url = self.submit_request(spoken, voice_id, webhook_url, on_progress, tone_list)
+            if handle is not None:
+                handle.request_id, handle.status_url = request_id, status_url
+
+            # Wait for the webhook, or poll until complete
+            if receiver:
+                status_data = self.wait_for_webhook(
+                    request_id, status_url, receiver, fallback_interval, on_progress, handle,
+                )
+            elif hedger:
+                status_data = self.poll_with_hedge(
+                    spoken, voice_id, request_id, status_url, hedger, poll_interval, on_progress, handle,
+                    tone_list,
+                )
+            else:
+                status_data = self.poll_until_complete(request_id, status_url, poll_interval, on_progress, handle)
+
+            self.fetch_and_download(status_data, output, cache, key, on_progress)
+
+        return output
+
+    def submit(self, text, voice_id, output=None, **options):
+        """
+        Start generate() on the client's executor.
+
+        Takes the same arguments as generate() (except handle).
+
+        Returns:
+            SpeechJob: Handle with result(), done(), cancel() and add_done_callback()
+        """
+        job = SpeechJob()
+        job.future = self.executor.submit(self.generate, text, voice_id, output, handle=job, **options)
+        return job
+
+    def generate_async(self, text, voice_id, poller, downloads, output=None, display_name=None, cache=None,
+                       on_progress=None, handle=None):
+        """Submit one job and hand its status checks to a shared StatusPoller.
+
+        Returns a Future of the output path. No thread waits on the job:
+        once the poller sees it complete, the result fetch and download run on
+        the downloads executor. Such a job is stopped with cancel_job(handle).
+        """
+        from poller import chain
+
+        validate_text(text)
+        output = self._output_for(output, voice_id, display_name, text, on_progress)
+        label = f"{display_name or voice_id}: {text[:40]}"
+
+        key = None
+        with tracing.job(label):
+            spoken, tone_list = self._prepare(text, on_progress)
+            if cache:
+                key, data = self._cached_audio(cache, spoken, voice_id, tone_list)
+                if data is not None:
+                    self._write_cached(data, output, on_progress)
+                    future = Future()
+                    future.set_result(output)
+                    return future
+
+            if handle is not None and handle.cancelled:
+                raise JobCancelled("Cancelled before submission")
+            request_id, status_url = self.submit_request(spoken, voice_id, on_progress=on_progress,
+                                                         tone_list=tone_list)
+            if handle is not None:
+                handle.request_id, handle.status_url = request_id, status_url
+        _emit(on_progress, "waiting", request_id=request_id, mode="poller", interval=poller.interval)
+        start_time = time.time()
+
+        def on_status(status_data):
+            if self._track(status_data, request_id, on_progress):
+                _emit(on_progress, "completed", request_id=request_id, elapsed=time.time() - start_time,
+                      via="poller")
+
+        def download(status_data):
+            with tracing.job(label):
+                return self.fetch_and_download(status_data, output, cache, key, on_progress)
+
+        return chain(poller.watch(request_id, status_url, label, on_status), downloads, download)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Multi-voice dialogue scripts for AI Voices
+
+A dialogue script is one line per utterance, tagged with its speaker.
+Speakers are mapped to voices in the script itself (or with --speaker on
+the command line), and every name goes through resolve_voice_id, so
+custom voice names from voices.py work:
+
+    # Speakers
+    @Alice = Wise_Woman
+    @Bob = My_Custom_Voice
+
+    Alice: Did you hear that?
+    Bob: Hear what?
+    [pause 1.5]
+    Alice: Exactly.
+
+All lines are rendered concurrently, then assembled in script order into
+one track with silence between lines, plus optional per-speaker stems
+that keep the same timeline.
+"""
+import os
+import re
+import tempfile
+
+import tracing
+from audio import count_frames, first_frame_header, frames_for, silent_frames, write_mp3
+from streaming import stream_jobs
+from voices import resolve_voice_id
+
+MAX_LINE_CHARS = 5000
+
+_MAPPING = re.compile(r"^@\s*(?P<speaker>[^=]+?)\s*=\s*(?P<voice>\S.*?)\s*$")
+_PAUSE = re.compile(r"^\[\s*pause\s+(?P<seconds>\d+(?:\.\d+)?)\s*s?\s*\]$", re.IGNORECASE)
+_LINE = re.compile(r"^(?P<speaker>[^:\[@#][^:]{0,39}?)\s*:\s*(?P<text>.*)$")
+
+
+def parse_dialogue(text):
+    """
+    Parse a dialogue script.
+
+    Returns:
+        tuple: (speaker -> voice dict, list of items), each item either
+            {"speaker", "text"} or {"pause": seconds}
+
+    Raises:
+        ValueError: On a line that is neither a mapping, pause, comment nor
+            "Speaker: text", or on an utterance over MAX_LINE_CHARS
+    """
+    voices = {}
+    items = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _MAPPING.match(line)
+        if match:
+            voices[match["speaker"]] = match["voice"]
+            continue
+        match = _PAUSE.match(line)
+        if match:
+            items.append({"pause": float(match["seconds"])})
+            continue
+        match = _LINE.match(line)
+        if not match or not match["text"].strip():
+            raise ValueError(f"Line {number}: expected \"Speaker: text\", got {line[:40]!r}")
+        utterance = " ".join(match["text"].split())
+        if len(utterance) > MAX_LINE_CHARS:
+            raise ValueError(f"Line {number}: too long ({len(utterance)} characters). Maximum is {MAX_LINE_CHARS}.")
+        items.append({"speaker": match["speaker"], "text": utterance, "line": number})
+    return voices, items
+
+
+def resolve_speakers(items, voices):
+    """
+    Resolve every speaker of a script to (voice_id, display_name).
+
+    Raises:
+        ValueError: If a speaker has no voice
+    """
+    resolved = {}
+    for item in items:
+        speaker = item.get("speaker")
+        if speaker is None or speaker in resolved:
+            continue
+        if speaker not in voices:
+            raise ValueError(
+                f"Line {item['line']}: no voice for speaker {speaker!r} "
+                f"(add \"@{speaker} = VOICE\" or --speaker \"{speaker}=VOICE\")"
+            )
+        resolved[speaker] = resolve_voice_id(voices[speaker])
+    return resolved
+
+
+def _stem_path(output_path, speaker):
+    safe = "".join(c if c.isalnum() else "_" for c in speaker.lower())
+    base, ext = os.path.splitext(output_path)
+    return f"{base}.{safe}{ext or '.mp3'}"
+
+
+def render_dialogue(script_path, render, speakers=None, output_path=None, gap=0.4, stems=False,
+                    max_in_flight=4):
+    """
+    Render a dialogue script into one track.
+
+    Args:
+        script_path: Path of the dialogue script
+        render: Callable(text, voice_id, display_name, clip_path) rendering one line
+        speakers: Speaker -> voice mapping overriding the script's own
+        output_path: Final track (default: the script path with .mp3)
+        gap: Seconds of silence between consecutive lines
+        stems: Also write one track per speaker, silent while others talk
+        max_in_flight: Maximum lines rendered at once
+
+    Returns:
+        dict: Summary with lines, speakers, failed, output and stems keys
+
+    Raises:
+        ValueError: If the script is malformed or a speaker has no voice
+    """
+    with open(script_path, encoding="utf-8") as f:
+        voices, items = parse_dialogue(f.read())
+    voices.update(speakers or {})
+    resolved = resolve_speakers(items, voices)
+    lines = [item for item in items if "text" in item]
+
+    output_path = output_path or os.path.splitext(script_path)[0] + ".mp3"
+    summary = {"lines": len(lines), "speakers": resolved, "failed": [], "output": None, "stems": {}}
+    if not lines:
+        return summary
+
+    with tempfile.TemporaryDirectory(prefix="ai-voices-dialogue-") as clip_dir:
+        def job(index_line):
+            index, line = index_line
+            voice_id, display_name = resolved[line["speaker"]]
+            clip_path = os.path.join(clip_dir, f"{index:05d}.mp3")
+            render(line["text"], voice_id, display_name, clip_path)
+            with open(clip_path, "rb") as f:
+                return f.read()
+
+        print(f"🎭 {len(lines)} lines, {len(resolved)} speakers - rendering up to {max_in_flight} lines at once\n")
+        clips = {}
+        for _, (index, line), data, error in stream_jobs(enumerate(lines), job, max_in_flight, ordered=False):
+            if error is not None:
+                summary["failed"].append(line["line"])
+            else:
+                clips[index] = data
+
+    if summary["failed"]:
+        return summary
+
+    # Silence takes the frame format of the first clip, so the track stays uniform
+    header = first_frame_header(clips[0])
+    durations = [count_frames(clips[index], header) for index in range(len(lines))]
+
+    # One timeline of (speaker or None for silence, audio, frames)
+    timeline = []
+    index = 0
+    for item in items:
+        if "pause" in item:
+            frames = frames_for(item["pause"], header)
+            timeline.append((None, silent_frames(frames, header), frames))
+            continue
+        if index > 0 and gap > 0:
+            frames = frames_for(gap, header)
+            timeline.append((None, silent_frames(frames, header), frames))
+        timeline.append((item["speaker"], clips[index], durations[index]))
+        index += 1
+
+    with tracing.span("concat", parts=len(timeline)):
+        write_mp3([data for _, data, _ in timeline], output_path)
+    summary["output"] = output_path
+
+    # Stems keep the full timeline: other speakers' lines become silence of equal length
+    if stems:
+        for speaker in resolved:
+            parts = [
+                data if who is None or who == speaker else silent_frames(frames, header)
+                for who, data, frames in timeline
+            ]
+            path = _stem_path(output_path, speaker)
+            with tracing.span("concat", stem=speaker):
+                write_mp3(parts, path)
+            summary["stems"][speaker] = path
+
+    return summary
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the fal.ai queue API
+
+Implements just enough of queue.fal.run for the MiniMax Speech-02 HD
+endpoint (submit, status, result, cancel, file download and webhook
+callbacks) to exercise AI Voices end to end without an API key or cost.
+
+Usage:
+    python fake_queue.py --port 8765 --latency 3
+    FAL_QUEUE_URL=http://127.0.0.1:8765 python main.py --voice Wise_Woman --text "Hi" --api-key test
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from local_server import LocalServer, QuietHandler
+
+MODEL_PATH = "/fal-ai/minimax/speech-02-hd"
+
+
+class FakeQueue(LocalServer):
+    """
+    In-process fake of the fal.ai queue.
+
+    Each job spends queue_delay seconds IN_QUEUE, then runs until latency
+    seconds after submission (plus up to jitter seconds) and completes.
+    A tail_fraction of jobs take tail_latency seconds instead, to simulate
+    stragglers. Jobs with a fal_webhook URL get a POST to it on completion.
+    With max_active set, submissions beyond that many unfinished jobs are
+    rejected with 429, like an account-level rate limit. connect_delay
+    seconds are spent on every new connection, to stand in for the DNS,
+    TCP and TLS setup of a real remote host.
+    """
+
+    thread_name = "fake-queue"
+
+    def __init__(self, host="127.0.0.1", port=0, latency=1.0, jitter=0.0,
+                 queue_delay=0.0, audio_size=32 * 1024, tail_fraction=0.0, tail_latency=10.0,
+                 max_active=None, connect_delay=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_fraction = tail_fraction
+        self.tail_latency = tail_latency
+        self.max_active = max_active
+        self.connect_delay = connect_delay
+        self.queue_delay = queue_delay
+        self.audio_size = audio_size
+        self.jobs = {}
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+        queue = self
+
+        class Handler(QuietHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                if queue.connect_delay:
+                    time.sleep(queue.connect_delay)
+
+            def do_POST(self):
+                queue._handle(self, "POST")
+
+            def do_GET(self):
+                queue._handle(self, "GET")
+
+            def do_PUT(self):
+                queue._handle(self, "PUT")
+
+            def do_HEAD(self):
+                # Connection checks (see prewarm.py) - answer without closing the connection
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        self._serve(Handler, host, port)
+
+    def stop(self):
+        """Stop the server and any pending webhook timers"""
+        with self._lock:
+            for job in self.jobs.values():
+                if job.get("timer"):
+                    job["timer"].cancel()
+        super().stop()
+
+    # ------------------------------------------------------------------
+    # Job state
+
+    def _job_urls(self, request_id):
+        base = f"{self.url}{MODEL_PATH}/requests/{request_id}"
+        return {
+            "request_id": request_id,
+            "response_url": base,
+            "status_url": f"{base}/status",
+            "cancel_url": f"{base}/cancel",
+        }
+
+    def _submit(self, body, webhook_url):
+        request_id = uuid.uuid4().hex
+        duration = self.latency + random.uniform(0, self.jitter)
+        if random.random() < self.tail_fraction:
+            duration = self.tail_latency
+        job = {
+            "submitted": time.time(),
+            "duration": duration,
+            "text": body.get("text", ""),
+            "webhook_url": webhook_url,
+            "cancelled": False,
+            "timer": None,
+        }
+        if webhook_url:
+            job["timer"] = threading.Timer(duration, self._fire_webhook, args=(request_id,))
+            job["timer"].daemon = True
+        with self._lock:
+            self.jobs[request_id] = job
+        if job["timer"]:
+            job["timer"].start()
+        return {"status": "IN_QUEUE", "queue_position": self._queue_position(job), **self._job_urls(request_id)}
+
+    def active_jobs(self):
+        """Number of submitted jobs that are neither completed nor cancelled"""
+        now = time.time()
+        with self._lock:
+            return sum(
+                1 for job in self.jobs.values()
+                if not job["cancelled"] and now - job["submitted"] < job["duration"]
+            )
+
+    def _queue_position(self, job):
+        now = time.time()
+        with self._lock:
+            return sum(
+                1 for other in self.jobs.values()
+                if not other["cancelled"]
+                and other["submitted"] < job["submitted"]
+                and now - other["submitted"] < self.queue_delay
+            )
+
+    def _status(self, request_id):
+        job = self.jobs[request_id]
+        elapsed = time.time() - job["submitted"]
+        if job["cancelled"]:
+            status = "CANCELLED"
+        elif elapsed >= job["duration"]:
+            status = "COMPLETED"
+        elif elapsed < self.queue_delay:
+            status = "IN_QUEUE"
+        else:
+            status = "IN_PROGRESS"
+        data = {"status": status, **self._job_urls(request_id)}
+        if status == "IN_QUEUE":
+            data["queue_position"] = self._queue_position(job)
+        return data
+
+    def _result(self, request_id):
+        return {
+            "audio": {
+                "url": f"{self.url}/files/{request_id}.mp3",
+                "content_type": "audio/mpeg",
+                "file_name": f"{request_id}.mp3",
+                "file_size": self.audio_size,
+            },
+            "duration_ms": int(1000 * len(self.jobs[request_id]["text"]) / 15),
+        }
+
+    def _fire_webhook(self, request_id):
+        job = self.jobs.get(request_id)
+        if not job or job["cancelled"]:
+            return
+        event = {
+            "request_id": request_id,
+            "gateway_request_id": request_id,
+            "status": "OK",
+            "payload": self._result(request_id),
+        }
+        try:
+            requests.post(job["webhook_url"], json=event, timeout=10)
+            self.counts["webhook"] += 1
+        except requests.RequestException:
+            self.counts["webhook_failed"] += 1
+
+    # ------------------------------------------------------------------
+    # HTTP
+
+    def _send(self, handler, code, body=None, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        body = body or b""
+        handler.send_response(code)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handle(self, handler, method):
+        parsed = urlparse(handler.path)
+        path = parsed.path
+        length = int(handler.headers.get("Content-Length") or 0)
+        raw = handler.rfile.read(length) if length else b""
+
+        if method == "GET" and path.startswith("/files/"):
+            self.counts["download"] += 1
+            request_id = path[len("/files/"):].removesuffix(".mp3")
+            if request_id not in self.jobs:
+                return self._send(handler, 404, {"detail": "Not found"})
+            # Empty ID3v2 tag followed by filler standing in for MPEG frames
+            audio = b"ID3\x04\x00\x00\x00\x00\x00\x00" + os.urandom(self.audio_size - 10)
+            return self._send(handler, 200, audio, "audio/mpeg")
+
+        if not handler.headers.get("Authorization", "").startswith("Key "):
+            return self._send(handler, 401, {"detail": "Missing API key"})
+
+        if method == "POST" and path == MODEL_PATH:
+            self.counts["submit"] += 1
+            if self.max_active is not None and self.active_jobs() >= self.max_active:
+                self.counts["rate_limited"] += 1
+                return self._send(handler, 429, {"detail": "Too many concurrent requests"})
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                return self._send(handler, 422, {"detail": "Invalid JSON"})
+            webhook_url = parse_qs(parsed.query).get("fal_webhook", [None])[0]
+            return self._send(handler, 200, self._submit(body, webhook_url))
+
+        prefix = f"{MODEL_PATH}/requests/"
+        if not path.startswith(prefix):
+            return self._send(handler, 404, {"detail": "Not found"})
+
+        request_id, _, action = path[len(prefix):].partition("/")
+        if request_id not in self.jobs:
+            return self._send(handler, 404, {"detail": "Request not found"})
+
+        if method == "GET" and action == "status":
+            self.counts["status"] += 1
+            data = self._status(request_id)
+            return self._send(handler, 200 if data["status"] == "COMPLETED" else 202, data)
+
+        if method == "GET" and action == "":
+            self.counts["result"] += 1
+            if self._status(request_id)["status"] != "COMPLETED":
+                return self._send(handler, 400, {"detail": "Request is still in progress"})
+            return self._send(handler, 200, self._result(request_id))
+
+        if method == "PUT" and action == "cancel":
+            self.counts["cancel"] += 1
+            job = self.jobs[request_id]
+            if self._status(request_id)["status"] == "COMPLETED":
+                return self._send(handler, 400, {"success": False})
+            job["cancelled"] = True
+            if job["timer"]:
+                job["timer"].cancel()
+            return self._send(handler, 200, {"success": True})
+
+        return self._send(handler, 405, {"detail": "Method not allowed"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the fal.ai queue API")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds until a job completes (default: 1)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds per job (default: 0)")
+    parser.add_argument("--queue-delay", type=float, default=0.0, help="Seconds a job reports IN_QUEUE (default: 0)")
+    parser.add_argument("--tail-fraction", type=float, default=0.0, help="Fraction of straggler jobs (default: 0)")
+    parser.add_argument("--tail-latency", type=float, default=10.0, help="Seconds a straggler takes (default: 10)")
+    parser.add_argument("--max-active", type=int, help="Reject submits with 429 beyond this many unfinished jobs")
+    parser.add_argument("--connect-delay", type=float, default=0.0,
+                        help="Seconds spent on each new connection, like TLS setup (default: 0)")
+    args = parser.parse_args()
+
+    queue = FakeQueue(
+        args.host, args.port, args.latency, args.jitter, args.queue_delay,
+        tail_fraction=args.tail_fraction, tail_latency=args.tail_latency, max_active=args.max_active,
+        connect_delay=args.connect_delay,
+    )
+    print(f"🧪 Fake queue listening on {queue.url}")
+    print(f"   export FAL_QUEUE_URL={queue.url}")
+    try:
+        queue.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 Requests served: {dict(queue.counts)}")
+
+
+if __name__ == "__main__":
+    main()
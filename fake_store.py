@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the shared result store
+
+A minimal WebDAV-style object store (GET, HEAD, PUT, DELETE on any path)
+kept in memory, for exercising the shared tier of result_cache.py
+without an S3 bucket or WebDAV server.
+
+Usage:
+    python fake_store.py --port 8766
+    python main.py --voice Wise_Woman --text "Hi" --shared-cache http://127.0.0.1:8766/results
+"""
+import argparse
+import threading
+from collections import Counter
+
+from local_server import LocalServer, QuietHandler
+
+
+class FakeStore(LocalServer):
+    """In-memory object store served over HTTP"""
+
+    thread_name = "fake-store"
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.objects = {}
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+        store = self
+
+        class Handler(QuietHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                store._get(self, body=True)
+
+            def do_HEAD(self):
+                store._get(self, body=False)
+
+            def do_PUT(self):
+                length = int(self.headers.get("Content-Length", 0))
+                data = self.rfile.read(length)
+                with store._lock:
+                    store.counts["PUT"] += 1
+                    created = self.path not in store.objects
+                    store.objects[self.path] = data
+                store._reply(self, 201 if created else 204)
+
+            def do_DELETE(self):
+                with store._lock:
+                    store.counts["DELETE"] += 1
+                    found = store.objects.pop(self.path, None) is not None
+                store._reply(self, 204 if found else 404)
+
+        self._serve(Handler, host, port)
+
+    def _get(self, handler, body):
+        with self._lock:
+            self.counts[handler.command] += 1
+            data = self.objects.get(handler.path)
+        if data is None:
+            self._reply(handler, 404)
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "audio/mpeg")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        if body:
+            handler.wfile.write(data)
+
+    def _reply(self, handler, status):
+        handler.send_response(status)
+        handler.send_header("Content-Length", "0")
+        handler.end_headers()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the shared result store")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8766, help="Port (default: 8766)")
+    args = parser.parse_args()
+
+    store = FakeStore(args.host, args.port)
+    print(f"🧪 Fake store listening on {store.url}")
+    try:
+        store.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 Requests served: {dict(store.counts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Hedged requests for AI Voices
+
+When a job is still not complete after a percentile of recently observed
+latencies, a duplicate is submitted and whichever copy completes first
+wins. The number of duplicates is capped as a percentage of primary jobs,
+and each duplicate also needs a free concurrency slot (see try_slot).
+"""
+import math
+import threading
+from collections import deque
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Hedger:
+    """
+    Shared hedging policy and statistics for one run.
+
+    Args:
+        hedge_percentile: Latency percentile after which a job is hedged
+        budget_percent: Maximum duplicate submissions, as a percentage of jobs
+        min_samples: Completed jobs needed before hedging starts
+        window: Number of recent latencies the threshold is computed from
+        try_slot: Callable taking a concurrency slot for a duplicate if one is
+            free right now; returns a callable that gives it back, or None
+            (default: duplicates only count against the budget)
+    """
+
+    def __init__(self, hedge_percentile=95, budget_percent=10, min_samples=10, window=500, try_slot=None):
+        self.hedge_percentile = hedge_percentile
+        self.budget_percent = budget_percent
+        self.min_samples = min_samples
+        self.try_slot = try_slot
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+        self.jobs = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.extra_requests = 0
+        self.latencies = []
+        self.primary_latencies = []
+        self.censored_latencies = []
+
+    def job_started(self):
+        """Count a primary submission (this grows the hedge budget)"""
+        with self._lock:
+            self.jobs += 1
+
+    def threshold(self):
+        """Seconds after which a job should be hedged, or None if not yet known"""
+        with self._lock:
+            if len(self._recent) < self.min_samples:
+                return None
+            return percentile(list(self._recent), self.hedge_percentile)
+
+    def try_acquire(self):
+        """
+        Reserve one duplicate submission if the budget allows it and a slot is free.
+
+        Returns:
+            callable or None: Gives the duplicate's slot back once it is finished
+        """
+        with self._lock:
+            if self.hedges + 1 > self.budget_percent / 100 * self.jobs:
+                return None
+            self.hedges += 1
+        release = self.try_slot() if self.try_slot else (lambda: None)
+        if release is None:
+            with self._lock:
+                self.hedges -= 1
+        return release
+
+    def record(self, latency, hedge_won=False):
+        """
+        Record a finished job.
+
+        Args:
+            latency: Seconds from primary submission to the first completion
+            hedge_won: True if the duplicate completed first
+        """
+        with self._lock:
+            self.latencies.append(latency)
+            if hedge_won:
+                # The primary was cancelled, so its own latency is only
+                # known to be longer than the winning latency; keeping the
+                # shortened latency out of the threshold stops it drifting down
+                self.hedge_wins += 1
+                self.censored_latencies.append(latency)
+            else:
+                self._recent.append(latency)
+                self.primary_latencies.append(latency)
+
+    def add_requests(self, count):
+        """Count HTTP requests spent on hedging (duplicate submits, status checks and cancels)"""
+        with self._lock:
+            self.extra_requests += count
+
+    def estimated_unhedged_latencies(self):
+        """
+        Estimate what every job's latency would have been without hedging.
+
+        Each cancelled primary is imputed as the median of the observed
+        primary latencies longer than its censoring point (or the censoring
+        point itself if none were that slow, which underestimates).
+        """
+        estimates = list(self.primary_latencies)
+        for censored_at in self.censored_latencies:
+            slower = [x for x in self.primary_latencies if x > censored_at]
+            estimates.append(percentile(slower, 50) if slower else censored_at)
+        return estimates
+
+    def report(self):
+        """Return a human-readable summary of what hedging cost and saved"""
+        with self._lock:
+            if not self.jobs:
+                return "🪞 Hedging: no jobs"
+            p50 = percentile(self.latencies, 50)
+            p99 = percentile(self.latencies, 99)
+            lines = [
+                "🪞 Hedging report",
+                f"   Jobs: {self.jobs}, hedged: {self.hedges} "
+                f"({100 * self.hedges / self.jobs:.1f}%), duplicate won: {self.hedge_wins}",
+                f"   Extra requests: {self.extra_requests} "
+                f"(duplicate submits, status checks and cancels)",
+            ]
+            if p99 is not None:
+                lines.append(f"   Latency p50: {p50:.1f}s, p99: {p99:.1f}s")
+                if self.hedge_wins:
+                    unhedged_p99 = percentile(self.estimated_unhedged_latencies(), 99)
+                    lines.append(
+                        f"   Estimated p99 without hedging: {unhedged_p99:.1f}s "
+                        f"(cut by {unhedged_p99 - p99:.1f}s)"
+                    )
+                else:
+                    lines.append("   p99 unchanged (no duplicate completed first)")
+            return "\n".join(lines)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Background HTTP servers for AI Voices
+
+The webhook receiver, the shared scheduler and the fake queue and store
+each serve a small request handler from a ThreadingHTTPServer on a
+background thread. LocalServer holds that plumbing in one place.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Request handler that does not log every request to stderr"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """
+    Base class of an object serving HTTP on a background thread.
+
+    Subclasses build their handler class in __init__ and pass it to
+    _serve(); url is then the server's http://host:port base. Use
+    start()/stop() or a with-block.
+    """
+
+    thread_name = "http-server"
+
+    def _serve(self, handler, host="127.0.0.1", port=0):
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        bound_host, bound_port = self._server.server_address[:2]
+        self.url = f"http://{bound_host}:{bound_port}"
+
+    def start(self):
+        """Start serving in a background thread"""
+        threading.Thread(target=self._server.serve_forever, name=self.thread_name, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        self._server.serve_forever()
+
+    def stop(self):
+        """Stop the server"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
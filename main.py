@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 """
 AI Voice Generator - Command-line text-to-speech tool using MiniMax Speech-02 HD API
+
+The command line is a front-end over client.SpeechClient: its progress
+events are printed as the messages below, and a SpeechError ends the run.
 """
 import argparse
-import requests
+import contextlib
+import json
 import time
 import os
 import sys
 
+import aimd
+import tracing
+from client import MODEL_ID, SpeechClient, SpeechError, generate_filename, validate_text
+
 # Import voice configuration
 from voices import (
     CUSTOM_VOICES,
@@ -19,264 +27,651 @@ from voices import (
     select_voice_interactive,
 )
 
+_COMPLETED_VIA = {
+    "poll": "",
+    "webhook": " (webhook)",
+    "fallback": " (fallback status check)",
+    "original": " (original request won)",
+    "duplicate": " (duplicate request won)",
+}
+
+
+def print_progress(event):
+    """Print a SpeechClient progress event"""
+    kind = event["event"]
+    if kind == "filename":
+        print(f"📝 Using auto-generated filename: {event['output']}\n")
+    elif kind == "preprocessed":
+        if event["replacements"] or event["tone_list"]:
+            print(f"📖 Dictionary: {event['replacements']} replacements, "
+                  f"{len(event['tone_list'])} pronunciations ({event['ms']:.1f} ms)")
+    elif kind == "submitting":
+        text = event["text"]
+        print(f"\n📤 Submitting request...")
+        print(f"   Text: {text[:50]}{'...' if len(text) > 50 else ''}")
+        print(f"   Voice: {event['voice_id']}")
+    elif kind == "retry":
+        print(f"⚠️  Upstream busy ({event['status_code']}), retrying in {event['delay']:.1f}s...")
+    elif kind == "submitted":
+        print(f"✅ Request submitted successfully! ({event['ack_ms']:.0f} ms)")
+        print(f"   Request ID: {event['request_id']}\n")
+    elif kind == "waiting":
+        if event["mode"] == "poller":
+            print(f"⏳ Request {event['request_id']} handed to the status poller\n")
+            return
+        print(f"⏳ Processing request (ID: {event['request_id']})...")
+        if event["mode"] == "webhook":
+            print(f"   Waiting for webhook (fallback status check every {event['interval']} seconds)...\n")
+        elif event["mode"] == "hedge":
+            print(f"   Checking status every {event['interval']} seconds (hedging enabled)...\n")
+        else:
+            print(f"   Checking status every {event['interval']} seconds...\n")
+    elif kind == "queued":
+        print(f"⏳ In queue... Position: {event['queue_position']}")
+    elif kind == "in_progress":
+        print(f"⚙️  Processing...")
+    elif kind == "hedged":
+        print(f"🪞 Still running after {event['elapsed']:.1f}s (threshold {event['threshold']:.1f}s), "
+              f"submitted duplicate {event['request_id']}")
+    elif kind == "hedge_cancelled":
+        print(f"🗑️  Cancelled slower request {event['request_id']}")
+    elif kind == "completed":
+        print(f"\n✅ Completed in {event['elapsed']:.1f} seconds!{_COMPLETED_VIA.get(event['via'], '')}\n")
+    elif kind == "fetching_result":
+        print(f"📥 Retrieving result from response URL...")
+        print(f"   URL: {event['url']}")
+    elif kind == "result_retry":
+        print(f"   Error getting result: {event['status_code']}")
+        print(f"   Trying alternative URL: {event['url']}")
+    elif kind == "downloading":
+        print(f"⬇️  Downloading audio...")
+        print(f"   URL: {event['url']}")
+        print(f"   Destination: {event['destination']}")
+    elif kind in ("downloaded", "cache_hit"):
+        print(f"✅ Downloaded successfully!" if kind == "downloaded" else f"♻️  Reused cached audio")
+        print(f"   File: {event['destination']}")
+        print(f"   Size: {event['bytes'] / 1024:.1f} KB\n")
+
+
+def print_error(error):
+    """Print a SpeechError with the upstream response, if any"""
+    print(f"❌ {error}")
+    if getattr(error, "response_text", None):
+        print(f"   Response: {error.response_text}")
+
+
+def generate_speech(text, voice_id, display_name, client, output_file="output.mp3", poll_interval=2,
+                    receiver=None, fallback_interval=30, hedger=None, cache=None, handle=None):
+    """Run one job with progress printed; "output.mp3" means an auto-generated file name"""
+    output = None if output_file == "output.mp3" else output_file
+    return client.generate(
+        text, voice_id, output, display_name, poll_interval, receiver, fallback_interval, hedger, cache,
+        on_progress=print_progress, handle=handle,
+    )
 
 
-def submit_request(text, voice_id, api_key):
-    """Submit a text-to-speech request and return request ID"""
-    url = "https://queue.fal.run/fal-ai/minimax/speech-02-hd"
-
-    headers = {
-        "Authorization": f"Key {api_key}",
-        "Content-Type": "application/json"
-    }
+def stream_filename(voice_id, display_name, text, index):
+    """Auto-generated name for a stream record, numbered so records with similar text never share a file"""
+    base, ext = os.path.splitext(generate_filename(voice_id, display_name, text))
+    return f"{base}-{index + 1:04d}{ext}"
 
-    payload = {
-        "text": text,
-        "voice_setting": {
-            "voice_id": voice_id
-        },
-        "output_format": "url"  # Get URL instead of hex
-    }
 
-    print(f"\n📤 Submitting request...")
-    print(f"   Text: {text[:50]}{'...' if len(text) > 50 else ''}")
-    print(f"   Voice: {voice_id}")
+def run_stream(args, client, receiver=None, hedger=None, job_slot=None, cache=None):
+    """Streaming mode: synthesize one utterance per stdin line or JSONL record.
 
-    response = requests.post(url, headers=headers, json=payload)
+    Progress output goes to stderr; stdout carries only one output path
+    (or JSON record with --jsonl) per completed job. On Ctrl+C every job
+    in flight is cancelled upstream, so none is left running (and billed).
+    """
+    import threading
+    from client import SpeechJob
+    from streaming import read_line_records, read_jsonl_records, stream_jobs
+
+    default_voice = args.voice
+    job_slot = job_slot or (lambda priority: contextlib.nullcontext())
+    records_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    # Handles of the jobs in flight, cancelled together on Ctrl+C
+    live = set()
+    live_lock = threading.Lock()
+    interrupted = False
+
+    def track(handle):
+        with live_lock:
+            if interrupted:
+                handle.cancel()
+            live.add(handle)
+
+    def untrack(handle):
+        with live_lock:
+            live.discard(handle)
+
+    def job(item):
+        index, record = item
+        if record.get("error"):
+            raise ValueError(record["error"])
+
+        text = record.get("text")
+        validate_text(text)
+
+        voice = record.get("voice") or default_voice
+        if not voice:
+            raise ValueError("No voice given (use --voice or a \"voice\" field)")
+        voice_id, display_name = resolve_voice_id(voice)
+        output = record.get("output") or stream_filename(voice_id, display_name, text, index)
+        handle = SpeechJob()
+        track(handle)
+
+        if poller:
+            # Hold the slot until the job's future resolves, not just until submission
+            slot = job_slot(record.get("priority") or args.priority)
+            slot.__enter__()
+            try:
+                future = client.generate_async(
+                    text, voice_id, poller, downloads, output, display_name, cache,
+                    on_progress=print_progress, handle=handle,
+                )
+            except BaseException:
+                slot.__exit__(*sys.exc_info())
+                untrack(handle)
+                raise
+            future.add_done_callback(lambda f: (slot.__exit__(None, None, None), untrack(handle)))
+            return future
 
-    if response.status_code != 200:
-        print(f"❌ Error submitting request: {response.status_code}")
-        print(f"   Response: {response.text}")
+        try:
+            with job_slot(record.get("priority") or args.priority):
+                return generate_speech(
+                    text,
+                    voice_id,
+                    display_name,
+                    client,
+                    output,
+                    args.poll_interval,
+                    receiver,
+                    args.webhook_fallback_interval,
+                    hedger,
+                    cache,
+                    handle,
+                )
+        finally:
+            untrack(handle)
+
+    if args.jsonl:
+        records = read_jsonl_records(sys.stdin)
+    else:
+        records = read_line_records(sys.stdin)
+
+    # Centralized polling: a few threads submit, poll and download for every job
+    poller = downloads = None
+    workers = None
+    if args.poller:
+        from concurrent.futures import ThreadPoolExecutor
+        from poller import StatusPoller
+        # Failed checks are retried through the poller's heap, under its rate cap
+        poller = StatusPoller(
+            lambda status_url: client.check_status(status_url, max_retries=0),
+            args.poll_interval, args.poll_rps, args.workers,
+        )
+        downloads = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="download")
+        workers = args.workers
+
+    failures = 0
+    try:
+        for _, (index, record), output_file, error in stream_jobs(
+            enumerate(records), job, args.max_in_flight, ordered=(args.order == "input"), workers=workers
+        ):
+            message = str(error) if error is not None else None
+
+            if message:
+                failures += 1
+                print(f"❌ Record {index + 1}: {message}")
+
+            if args.jsonl:
+                out = {"index": index, "text": record.get("text"), "output": output_file}
+                if message:
+                    out["error"] = message
+                records_out.write(json.dumps(out, ensure_ascii=False) + "\n")
+            elif not message:
+                records_out.write(output_file + "\n")
+            records_out.flush()
+    except KeyboardInterrupt:
+        with live_lock:
+            interrupted = True
+            handles = list(live)
+        print(f"\n🛑 Cancelling {len(handles)} job(s) in flight...")
+        for handle in handles:
+            client.cancel_job(handle)
+        raise
+    finally:
+        sys.stdout = records_out
+        if poller:
+            print(f"📡 Status poller made {poller.polls} status checks", file=sys.stderr)
+            poller.close()
+            downloads.shutdown(wait=False, cancel_futures=True)
+
+    return failures
+
+
+def run_build(args, voice_id, display_name, client, receiver=None, hedger=None, job_slot=None, cache=None):
+    """Build mode: render only the changed segments of a script and reassemble it"""
+    from script_build import build_script
+
+    job_slot = job_slot or (lambda priority: contextlib.nullcontext())
+    settings = {"model": MODEL_ID, "voice_id": voice_id}
+    if client.preprocessor.fingerprint:
+        settings["pronunciations"] = client.preprocessor.fingerprint
+
+    def render(text, clip_path):
+        with job_slot(args.priority):
+            try:
+                generate_speech(
+                    text, voice_id, display_name, client, clip_path, args.poll_interval,
+                    receiver, args.webhook_fallback_interval, hedger, cache,
+                )
+            except SpeechError as e:
+                print_error(e)
+                raise
+
+    output = None if args.output == "output.mp3" else args.output
+    try:
+        summary = build_script(args.build, settings, render, output, args.build_dir, args.max_in_flight)
+    except OSError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n❌ Cancelled by user")
         sys.exit(1)
 
-    result = response.json()
-    request_id = result.get("request_id")
-    status_url = result.get("status_url")
-
-    print(f"✅ Request submitted successfully!")
-    print(f"   Request ID: {request_id}\n")
+    print(f"🧱 Segments: {summary['segments']}, reused: {summary['reused']}, "
+          f"rendered: {summary['rendered']}, failed: {summary['failed']}")
 
-    return request_id, status_url
+    if summary["failed"]:
+        print("❌ Some segments failed; rerun to retry only those")
+        sys.exit(1)
+    if not summary["segments"]:
+        print("❌ Error: Script has no text")
+        sys.exit(1)
 
+    print(f"🎉 All done! Your audio file is ready at: {summary['output']}")
 
-def check_status(status_url, api_key):
-    """Check the status of the request"""
-    headers = {
-        "Authorization": f"Key {api_key}"
-    }
 
-    response = requests.get(status_url, headers=headers)
+def run_dialogue(args, client, receiver=None, hedger=None, job_slot=None, cache=None):
+    """Dialogue mode: render a speaker-tagged script concurrently into one track"""
+    from dialogue import render_dialogue
 
-    # 202 is a normal response for async operations (IN_QUEUE or IN_PROGRESS)
-    if response.status_code not in [200, 202]:
-        print(f"❌ Error checking status: {response.status_code}")
-        return None
+    job_slot = job_slot or (lambda priority: contextlib.nullcontext())
+    speakers = {}
+    for mapping in args.speaker or []:
+        speaker, sep, voice = mapping.partition("=")
+        if not sep or not speaker.strip() or not voice.strip():
+            print(f"❌ Error: --speaker expects NAME=VOICE, got {mapping!r}")
+            sys.exit(1)
+        speakers[speaker.strip()] = voice.strip()
+
+    line_times = []
+
+    def render(text, voice_id, display_name, clip_path):
+        started = time.time()
+        with job_slot(args.priority):
+            try:
+                generate_speech(
+                    text, voice_id, display_name, client, clip_path, args.poll_interval,
+                    receiver, args.webhook_fallback_interval, hedger, cache,
+                )
+            except SpeechError as e:
+                print_error(e)
+                raise
+        line_times.append(time.time() - started)
+
+    output = None if args.output == "output.mp3" else args.output
+    started = time.time()
+    try:
+        summary = render_dialogue(
+            args.dialogue, render, speakers, output, args.gap, args.stems, args.max_in_flight,
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n❌ Cancelled by user")
+        sys.exit(1)
+    elapsed = time.time() - started
 
-    return response.json()
+    for speaker, (voice_id, display_name) in summary["speakers"].items():
+        print(f"🎭 {speaker}: {display_name}" + (f" (ID: {voice_id})" if display_name != voice_id else ""))
 
+    if summary["failed"]:
+        print(f"❌ Lines failed: {', '.join(str(line) for line in summary['failed'])}")
+        sys.exit(1)
+    if not summary["lines"]:
+        print("❌ Error: Dialogue has no lines")
+        sys.exit(1)
 
-def poll_until_complete(request_id, status_url, api_key, poll_interval=2):
-    """Poll the status URL until the request is complete"""
-    print(f"⏳ Processing request (ID: {request_id})...")
-    print(f"   Checking status every {poll_interval} seconds...\n")
+    if line_times:
+        print(f"⏱️  Rendered {summary['lines']} lines in {elapsed:.1f}s "
+              f"(slowest line {max(line_times):.1f}s, sum of lines {sum(line_times):.1f}s)")
+    for speaker, path in summary["stems"].items():
+        print(f"🎚️  Stem for {speaker}: {path}")
+    print(f"🎉 All done! Your audio file is ready at: {summary['output']}")
 
-    start_time = time.time()
 
-    while True:
-        status_data = check_status(status_url, api_key)
+def main():
+    parser = argparse.ArgumentParser(
+        description="AI Voice Generator - Convert text to speech using MiniMax Speech-02 HD",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --voice "Wise_Woman" --text "Hello world"
+  %(prog)s --list-voices
+  %(prog)s --voice "Deep_Voice_Man" --text "This is a test" --output test.mp3
+  cat lines.txt | %(prog)s --voice "Calm_Woman" --stream --max-in-flight 8
+  %(prog)s --voice "Calm_Woman" --text "Hello" --output - | ffmpeg -i pipe:0 hello.wav
+  %(prog)s --voice "Calm_Woman" --build script.txt
+  %(prog)s --dialogue interview.txt --speaker "Host=Wise_Woman" --stems
 
-        if not status_data:
-            print("❌ Failed to get status")
-            sys.exit(1)
+Environment Variables:
+  FAL_KEY        Your fal.ai API key (required if not using --api-key)
+  FAL_QUEUE_URL  Queue API base URL (default: https://queue.fal.run)
+  FAL_CDN_URL    Audio download host warmed during interactive input (default: fal.media and v3.fal.media)
+  AI_VOICES_CACHE               Set to "on" to cache results in the Rich and Textual versions
+  AI_VOICES_SHARED_CACHE        Shared result store URL (same as --shared-cache)
+  AI_VOICES_SHARED_CACHE_TOKEN  Bearer token sent to the shared result store
+  AI_VOICES_PRONUNCIATIONS      Pronunciation dictionary file (same as --pronunciations)
+  AI_VOICES_DICTIONARY_CACHE    Directory of compiled dictionaries (default: ~/.cache/ai-voices/dictionaries)
+"""
+    )
 
-        status = status_data.get("status")
-        queue_position = status_data.get("queue_position", 0)
-
-        if status == "IN_QUEUE":
-            print(f"⏳ In queue... Position: {queue_position}")
-        elif status == "IN_PROGRESS":
-            print(f"⚙️  Processing...")
-        elif status == "COMPLETED":
-            elapsed = time.time() - start_time
-            print(f"\n✅ Completed in {elapsed:.1f} seconds!\n")
-            return status_data
-        else:
-            print(f"❌ Unknown status: {status}")
-            sys.exit(1)
+    parser.add_argument(
+        "--voice",
+        type=str,
+        help="Voice ID to use (see --list-voices for all options)"
+    )
 
-        time.sleep(poll_interval)
+    parser.add_argument(
+        "--text",
+        type=str,
+        help="Text to convert to speech"
+    )
 
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="output.mp3",
+        help="Output file path, or - to stream the audio to stdout (default: output.mp3)"
+    )
 
-def get_result(response_url, api_key):
-    """Get the final result of the request"""
-    headers = {
-        "Authorization": f"Key {api_key}"
-    }
+    parser.add_argument(
+        "--api-key",
+        type=str,
+        help="fal.ai API key (or set FAL_KEY environment variable)"
+    )
 
-    print(f"📥 Retrieving result from response URL...")
-    print(f"   URL: {response_url}")
+    parser.add_argument(
+        "--list-voices",
+        action="store_true",
+        help="List all available voice IDs and exit"
+    )
 
-    response = requests.get(response_url, headers=headers)
+    parser.add_argument(
+        "--poll-interval",
+        type=int,
+        default=2,
+        help="Seconds to wait between status checks (default: 2)"
+    )
 
-    if response.status_code != 200:
-        print(f"❌ Error getting result: {response.status_code}")
-        print(f"   Response: {response.text}")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read stdin as a stream: one utterance per line, print each output path as it completes"
+    )
 
-        # Try alternative URL patterns
-        if "/queue/" in response_url:
-            # Try without /queue/
-            alt_url = response_url.replace("/queue/", "/")
-            print(f"   Trying alternative URL: {alt_url}")
-            response = requests.get(alt_url, headers=headers)
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="With --stream: read JSONL records ({\"text\", \"voice\", \"output\"}) and print JSONL results"
+    )
 
-            if response.status_code != 200:
-                print(f"   Alternative also failed: {response.status_code}")
-                sys.exit(1)
-        else:
-            sys.exit(1)
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="With --stream/--build/--dialogue: maximum number of jobs in flight (default: 4)"
+    )
 
-    return response.json()
+    parser.add_argument(
+        "--order",
+        choices=["input", "completion"],
+        default="input",
+        help="With --stream: emit results in input or completion order (default: input)"
+    )
 
+    parser.add_argument(
+        "--webhook",
+        action="store_true",
+        help="Wait for completion webhooks on a local receiver instead of polling"
+    )
 
-def generate_filename(voice_id, display_name, text, default_output="output.mp3"):
-    """Generate a filename based on voice and text with naming convention.
+    parser.add_argument(
+        "--webhook-port",
+        type=int,
+        default=0,
+        help="With --webhook: port for the local receiver (default: any free port)"
+    )
 
-    Format: For custom voices: {display_name}-{YYYY-MM-DD}-{text}.mp3
-            For built-in voices: {voice_id}-{YYYY-MM-DD}-{text}.mp3
-    Maximum filename length: 100 characters
-    """
-    from datetime import datetime
+    parser.add_argument(
+        "--webhook-url",
+        type=str,
+        help="With --webhook: public URL that forwards to the receiver (e.g. a tunnel); required unless FAL_QUEUE_URL is local"
+    )
 
-    # Get current date
-    date_str = datetime.now().strftime("%Y-%m-%d")
+    parser.add_argument(
+        "--webhook-fallback-interval",
+        type=int,
+        default=30,
+        help="With --webhook: seconds between fallback status checks (default: 30)"
+    )
 
-    # Use display name for custom voices, voice_id for built-in voices
-    if display_name != voice_id:
-        # This is a custom voice - use the display name (sanitized)
-        voice_identifier = "".join(c if c.isalnum() else "_" for c in display_name.lower())
-    else:
-        # This is a built-in voice - use the voice ID (sanitized)
-        voice_identifier = "".join(c if c.isalnum() else "_" for c in voice_id.lower())
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Submit a duplicate of jobs that run past a latency percentile; the first to complete wins"
+    )
 
-    # Sanitize text for filename
-    # Remove or replace special characters, keep alphanumeric and spaces
-    safe_text = "".join(c if c.isalnum() or c in (" ", "-", "_") else "_" for c in text)
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=95,
+        help="With --hedge: latency percentile after which a job is duplicated (default: 95)"
+    )
 
-    # Replace multiple spaces/underscores with single underscore
-    import re
-    safe_text = re.sub(r"[_\s]+", "_", safe_text)
+    parser.add_argument(
+        "--hedge-budget",
+        type=float,
+        default=10,
+        help="With --hedge: maximum duplicates as a percentage of jobs (default: 10)"
+    )
 
-    # Remove leading/trailing underscores
-    safe_text = safe_text.strip("_")
+    parser.add_argument(
+        "--priority",
+        choices=["interactive", "normal", "bulk"],
+        default="normal",
+        help="Scheduling class for this run's jobs (default: normal)"
+    )
 
-    # Calculate available space for text
-    # Format: {voice_identifier}-{date}-{text}.mp3
-    # voice_identifier + "-" + date + "-" + text + ".mp3"
-    # 100 max total
-    date_part = len(date_str)  # YYYY-MM-DD = 10 chars
-    extension_part = 4  # .mp3 = 4 chars
-    separators = 2  # two hyphens
-    voice_part = len(voice_identifier)
+    parser.add_argument(
+        "--scheduler-slots",
+        type=int,
+        help="With --stream: run jobs through a local priority scheduler with this many slots"
+    )
 
-    # Available for text
-    available_for_text = 100 - date_part - extension_part - separators - voice_part
+    parser.add_argument(
+        "--reserve",
+        type=str,
+        default="interactive=1,bulk=1",
+        help="Slots reserved per scheduling class (default: interactive=1,bulk=1)"
+    )
 
-    # Ensure we have at least some text
-    if available_for_text < 1:
-        # Voice identifier is too long, truncate it
-        max_voice_len = 100 - date_part - extension_part - separators - 1
-        voice_identifier = voice_identifier[:max_voice_len]
-        available_for_text = 100 - date_part - extension_part - separators - len(voice_identifier)
+    parser.add_argument(
+        "--serve-scheduler",
+        type=int,
+        metavar="PORT",
+        help="With --stream: share the scheduler with other runs on this local port"
+    )
 
-    # Truncate text if needed
-    if len(safe_text) > available_for_text:
-        safe_text = safe_text[:available_for_text].rstrip("_")
+    parser.add_argument(
+        "--scheduler-url",
+        type=str,
+        default=os.environ.get("AI_VOICES_SCHEDULER_URL"),
+        help="Take job slots from a shared scheduler (or set AI_VOICES_SCHEDULER_URL)"
+    )
 
-    # Construct filename
-    filename = f"{voice_identifier}-{date_str}-{safe_text}.mp3"
+    parser.add_argument(
+        "--build",
+        type=str,
+        metavar="SCRIPT",
+        help="Render a script file incrementally: only new or changed paragraphs are regenerated"
+    )
 
-    return filename
+    parser.add_argument(
+        "--build-dir",
+        type=str,
+        help="With --build: where clips and the build manifest are kept (default: SCRIPT.build)"
+    )
 
+    parser.add_argument(
+        "--dialogue",
+        type=str,
+        metavar="SCRIPT",
+        help="Render a speaker-tagged dialogue script (\"Speaker: text\" lines) into one track"
+    )
 
-def download_audio(audio_url, output_path):
-    """Download the audio file"""
-    print(f"⬇️  Downloading audio...")
-    print(f"   URL: {audio_url}")
-    print(f"   Destination: {output_path}")
+    parser.add_argument(
+        "--speaker",
+        type=str,
+        action="append",
+        metavar="NAME=VOICE",
+        help="With --dialogue: voice of a speaker, overriding the script's @NAME = VOICE lines (repeatable)"
+    )
 
-    response = requests.get(audio_url)
+    parser.add_argument(
+        "--gap",
+        type=float,
+        default=0.4,
+        help="With --dialogue: seconds of silence between lines (default: 0.4)"
+    )
 
-    if response.status_code != 200:
-        print(f"❌ Error downloading file: {response.status_code}")
-        sys.exit(1)
+    parser.add_argument(
+        "--stems",
+        action="store_true",
+        help="With --dialogue: also write one track per speaker, aligned to the full dialogue"
+    )
 
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else ".", exist_ok=True)
+    parser.add_argument(
+        "--trace",
+        type=str,
+        metavar="FILE",
+        help="Record a Chrome trace-event JSON of every job stage (open in ui.perfetto.dev)"
+    )
 
-    with open(output_path, "wb") as f:
-        f.write(response.content)
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="With --stream/--build: adapt the number of in-flight jobs (AIMD) up to --max-in-flight"
+    )
 
-    file_size = os.path.getsize(output_path)
-    print(f"✅ Downloaded successfully!")
-    print(f"   File: {output_path}")
-    print(f"   Size: {file_size / 1024:.1f} KB\n")
+    parser.add_argument(
+        "--adaptive-initial",
+        type=int,
+        default=4,
+        help="With --adaptive: starting number of in-flight jobs (default: 4)"
+    )
 
+    parser.add_argument(
+        "--adaptive-log",
+        type=str,
+        metavar="FILE",
+        help="With --adaptive: append each concurrency decision as a JSON line to FILE (default: stderr)"
+    )
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="AI Voice Generator - Convert text to speech using MiniMax Speech-02 HD",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  %(prog)s --voice "Wise_Woman" --text "Hello world"
-  %(prog)s --list-voices
-  %(prog)s --voice "Deep_Voice_Man" --text "This is a test" --output test.mp3
+    parser.add_argument(
+        "--poller",
+        action="store_true",
+        help="With --stream: one shared status poller for all jobs instead of a waiting thread per job"
+    )
 
-Environment Variables:
-  FAL_KEY    Your fal.ai API key (required if not using --api-key)
-"""
+    parser.add_argument(
+        "--poll-rps",
+        type=float,
+        default=20,
+        help="With --poller: maximum status requests per second (default: 20)"
     )
 
     parser.add_argument(
-        "--voice",
-        type=str,
-        help="Voice ID to use (see --list-voices for all options)"
+        "--workers",
+        type=int,
+        default=4,
+        help="With --poller: threads for each of submit, status checks and downloads (default: 4)"
     )
 
     parser.add_argument(
-        "--text",
-        type=str,
-        help="Text to convert to speech"
+        "--cache",
+        action="store_true",
+        help="Reuse audio already generated for the same text and voice (memory, then disk cache)"
     )
 
     parser.add_argument(
-        "--output",
+        "--cache-dir",
         type=str,
-        default="output.mp3",
-        help="Output file path (default: output.mp3)"
+        help="With --cache: disk cache directory (default: ~/.cache/ai-voices/results)"
     )
 
     parser.add_argument(
-        "--api-key",
-        type=str,
-        help="fal.ai API key (or set FAL_KEY environment variable)"
+        "--cache-max-mb",
+        type=int,
+        default=1024,
+        help="With --cache: disk cache size limit in MB (default: 1024)"
     )
 
     parser.add_argument(
-        "--list-voices",
-        action="store_true",
-        help="List all available voice IDs and exit"
+        "--shared-cache",
+        type=str,
+        metavar="URL",
+        default=os.environ.get("AI_VOICES_SHARED_CACHE"),
+        help="Also use a shared HTTP/WebDAV or S3-compatible store as the last cache tier (implies --cache)"
     )
 
     parser.add_argument(
-        "--poll-interval",
-        type=int,
-        default=2,
-        help="Seconds to wait between status checks (default: 2)"
+        "--pronunciations",
+        type=str,
+        metavar="FILE",
+        default=os.environ.get("AI_VOICES_PRONUNCIATIONS"),
+        help="Pronunciation dictionary: replacements applied to every text, tone entries sent with it"
     )
 
     args = parser.parse_args()
 
+    if args.max_in_flight is None:
+        args.max_in_flight = 4
+
+    # Tracing - the trace is written however the run ends
+    if args.trace:
+        import atexit
+        recorder = tracing.enable()
+
+        def save_trace():
+            recorder.save(args.trace)
+            print(f"🔍 Trace written to {args.trace} ({len(recorder.events)} spans)", file=sys.stderr)
+
+        atexit.register(save_trace)
+
+    # Piping audio to stdout - every human-readable message goes to stderr
+    audio_out = None
+    if args.output == "-":
+        if args.stream or args.jsonl or args.build or args.dialogue:
+            parser.error("--output - cannot be combined with --stream, --build or --dialogue")
+        audio_out = sys.stdout.buffer
+        sys.stdout = sys.stderr
+
     # List voices and exit
     if args.list_voices:
         list_voices()
@@ -290,9 +685,172 @@ Environment Variables:
         print("   Either use --api-key flag or set FAL_KEY environment variable")
         sys.exit(1)
 
+    # Pronunciation dictionary, compiled once and cached on disk
+    preprocessor = None
+    if args.pronunciations:
+        from preprocess import PronunciationDictionary, TextPreprocessor
+        try:
+            dictionary = PronunciationDictionary.load(args.pronunciations)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error: Pronunciation dictionary {args.pronunciations}: {e}")
+            sys.exit(1)
+        preprocessor = TextPreprocessor(dictionary)
+        print(f"📖 Pronunciation dictionary: {len(dictionary)} entries\n", file=sys.stderr)
+
+    client = SpeechClient(api_key, preprocessor=preprocessor)
+
+    # Start the webhook receiver shared by every job in this run
+    receiver = None
+    if args.webhook:
+        from urllib.parse import urlsplit
+        from client import QUEUE_URL
+        from webhooks import WebhookReceiver
+        if not args.webhook_url and urlsplit(QUEUE_URL).hostname not in ("127.0.0.1", "localhost", "::1"):
+            parser.error("--webhook needs --webhook-url (a public address forwarding to the receiver); "
+                         "the receiver only listens on 127.0.0.1 without one")
+        receiver = WebhookReceiver(port=args.webhook_port, public_url=args.webhook_url).start()
+        print(f"🪝 Webhook receiver listening at {receiver.url}\n", file=sys.stderr)
+
+    if args.poller and (args.webhook or args.hedge):
+        print("⚠️  Warning: --poller is ignored with --webhook or --hedge\n", file=sys.stderr)
+        args.poller = False
+
+    # Hedging applies to polled jobs, so it is skipped in webhook mode
+    # Hedging needs a latency history, so a single --text job never hedges
+    hedger = None
+    if args.hedge and args.webhook:
+        print("⚠️  Warning: --hedge is ignored with --webhook\n", file=sys.stderr)
+    elif args.hedge and not (args.stream or args.jsonl or args.build or args.dialogue):
+        print("⚠️  Warning: --hedge is ignored outside --stream, --jsonl, --build and --dialogue\n", file=sys.stderr)
+    elif args.hedge:
+        from hedging import Hedger
+        hedger = Hedger(args.hedge_percentile, args.hedge_budget)
+
+    # Pick where job slots come from: a shared scheduler, a local one, or none
+    scheduler = None
+    if args.scheduler_url:
+        from scheduler import remote_slot
+
+        def job_slot(priority):
+            return remote_slot(args.scheduler_url, priority)
+    elif (args.stream or args.jsonl) and (args.scheduler_slots or args.serve_scheduler):
+        from scheduler import PriorityScheduler, SchedulerServer, parse_reservations
+        try:
+            scheduler = PriorityScheduler(
+                args.scheduler_slots or args.max_in_flight, parse_reservations(args.reserve)
+            )
+        except ValueError as e:
+            print(f"❌ Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        job_slot = scheduler.slot
+        if args.serve_scheduler:
+            server = SchedulerServer(scheduler, port=args.serve_scheduler).start()
+            print(f"🚦 Sharing scheduler at {server.url} (set AI_VOICES_SCHEDULER_URL)\n", file=sys.stderr)
+    else:
+        def job_slot(priority):
+            return contextlib.nullcontext()
+
+    # Adaptive concurrency - wraps whatever slot source was chosen above
+    controller = None
+    if args.adaptive and (args.stream or args.jsonl or args.build or args.dialogue):
+        decision_log = aimd.stderr_log
+        if args.adaptive_log:
+            def decision_log(decision):
+                with open(args.adaptive_log, "a") as f:
+                    f.write(json.dumps(decision) + "\n")
+
+        controller = aimd.install(aimd.AIMDController(
+            initial=args.adaptive_initial, maximum=args.max_in_flight or 64, log=decision_log,
+        ))
+        base_slot = job_slot
+
+        @contextlib.contextmanager
+        def job_slot(priority):
+            with base_slot(priority), controller.slot():
+                yield
+
+    # Duplicates count against the same limits as jobs: a job is only hedged
+    # while the local scheduler and the adaptive limit have a slot free
+    if hedger and (scheduler or controller):
+        def hedge_slot():
+            if scheduler and not scheduler.try_acquire(args.priority):
+                return None
+            started = controller.try_acquire() if controller else None
+            if controller and started is None:
+                if scheduler:
+                    scheduler.release(args.priority)
+                return None
+
+            def release():
+                if controller:
+                    controller.release(started, completed=False)
+                if scheduler:
+                    scheduler.release(args.priority)
+            return release
+
+        hedger.try_slot = hedge_slot
+
+    # Result cache: memory -> disk -> shared store
+    cache = None
+    if args.cache or args.shared_cache:
+        from result_cache import DEFAULT_CACHE_DIR, build_cache
+        token = os.environ.get("AI_VOICES_SHARED_CACHE_TOKEN")
+        cache = build_cache(
+            cache_dir=args.cache_dir or DEFAULT_CACHE_DIR,
+            disk_mb=args.cache_max_mb,
+            shared_url=args.shared_cache,
+            shared_headers={"Authorization": f"Bearer {token}"} if token else None,
+            session=client.transport,
+        )
+
+    # Streaming mode - stdin carries the text, so there is no interactive menu
+    if args.stream or args.jsonl:
+        if args.voice is None and not args.jsonl:
+            print("❌ Error: --voice is required with --stream", file=sys.stderr)
+            sys.exit(1)
+        try:
+            failures = run_stream(args, client, receiver, hedger, job_slot, cache)
+        except KeyboardInterrupt:
+            print("\n\n❌ Cancelled by user", file=sys.stderr)
+            sys.exit(1)
+        if scheduler:
+            print(scheduler.report(), file=sys.stderr)
+        if controller:
+            print(controller.report(), file=sys.stderr)
+        if hedger:
+            print(hedger.report(), file=sys.stderr)
+        if cache:
+            print(cache.report(), file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+    # Dialogue mode - each speaker brings its own voice
+    if args.dialogue:
+        run_dialogue(args, client, receiver, hedger, job_slot, cache)
+        if controller:
+            print(controller.report())
+        if hedger:
+            print(hedger.report())
+        if cache:
+            print(cache.report())
+        return
+
+    # Warm connections to the queue and CDN while the user picks a voice or types
+    warmer = None
+    if not args.build and (args.voice is None or not args.text):
+        from prewarm import CDN_URLS, ConnectionWarmer
+        warmer = ConnectionWarmer(client.transport, [client.queue_url, *CDN_URLS]).start()
+
     # Get voice - show interactive menu if not provided
     if args.voice is None:
-        args.voice = select_voice_interactive()
+        from previews import PreviewCache, previews_enabled
+        previews = PreviewCache()
+        preview_warmer = previews.warm(api_key) if previews_enabled() else None
+        try:
+            args.voice = select_voice_interactive(previews)
+        finally:
+            # Previews only matter while choosing; don't generate the rest before exiting
+            if preview_warmer:
+                preview_warmer.cancel()
 
     # Resolve voice input to actual voice ID
     voice_id, display_name = resolve_voice_id(args.voice)
@@ -309,6 +867,17 @@ Environment Variables:
         else:
             print(f"✅ Using voice: {voice_id}\n")
 
+    # Build mode - render a script file, reusing clips from the previous build
+    if args.build:
+        run_build(args, voice_id, display_name, client, receiver, hedger, job_slot, cache)
+        if controller:
+            print(controller.report())
+        if hedger:
+            print(hedger.report())
+        if cache:
+            print(cache.report())
+        return
+
     # Get text from user if not provided
     text = args.text
     if not text:
@@ -323,54 +892,36 @@ Environment Variables:
             print("\n\n❌ Cancelled by user")
             sys.exit(1)
 
-    if not text.strip():
-        print("❌ Error: Empty text provided")
-        sys.exit(1)
+    if warmer:
+        warmer.stop()
 
-    if len(text) > 5000:
-        print(f"❌ Error: Text too long ({len(text)} characters). Maximum is 5000.")
+    try:
+        validate_text(text)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
         sys.exit(1)
 
     try:
-        # Generate filename if not provided
-        output_file = args.output
-        if output_file == "output.mp3":
-            # User didn't specify custom output, use naming convention
-            output_file = generate_filename(voice_id, display_name, text)
-            print(f"📝 Using auto-generated filename: {output_file}\n")
-
-        # Submit request
-        request_id, status_url = submit_request(text, voice_id, api_key)
-
-        # Poll until complete
-        status_data = poll_until_complete(request_id, status_url, api_key, args.poll_interval)
-
-        # Get the response_url from the final status
-        response_url = status_data.get("response_url")
-        if not response_url:
-            print("❌ Error: No response_url in status data")
-            sys.exit(1)
-
-        # Get result
-        result = get_result(response_url, api_key)
-
-        # Download audio
-        audio_url = result.get("audio", {}).get("url")
-        if not audio_url:
-            print("❌ Error: No audio URL in response")
-            sys.exit(1)
-
-        download_audio(audio_url, output_file)
-
-        print(f"🎉 All done! Your audio file is ready at: {output_file}")
+        with job_slot(args.priority):
+            output_file = generate_speech(
+                text, voice_id, display_name, client, audio_out or args.output, args.poll_interval,
+                receiver, args.webhook_fallback_interval, hedger, cache,
+            )
+
+        if audio_out:
+            print("🎉 All done! Your audio was written to stdout")
+        else:
+            print(f"🎉 All done! Your audio file is ready at: {output_file}")
 
     except KeyboardInterrupt:
         print("\n\n❌ Cancelled by user")
         sys.exit(1)
+    except SpeechError as e:
+        print_error(e)
+        sys.exit(1)
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
         sys.exit(1)
 
-
 if __name__ == "__main__":
     main()
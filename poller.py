@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Centralized status poller for AI Voices
+
+Instead of one sleeping thread per job calling poll_until_complete, a
+single StatusPoller owns the status checks of every in-flight job. Jobs
+sit in a heap ordered by their next due time, first polls are spread
+evenly over the poll interval, and a token bucket caps status requests
+per second. A handful of worker threads can track 10k+ pending jobs.
+
+A failed status check is never retried in place, which would stall a
+worker thread and bypass the rate cap: the job goes back on the heap
+with exponential backoff instead.
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import tracing
+from client import RETRY_STATUS_CODES, StatusError
+
+
+class PollError(StatusError):
+    """A status check failed or returned an unexpected status"""
+
+
+class StatusPoller:
+    """
+    Shared status poller.
+
+    Args:
+        check: Callable(status_url) returning status data; None or an exception on failure.
+            It should not retry by itself (e.g. check_status with max_retries=0)
+        interval: Target seconds between polls of the same job
+        max_rps: Maximum status requests per second across all jobs
+        workers: Threads issuing status requests
+        max_failures: Consecutive failed checks of one job before it fails
+    """
+
+    def __init__(self, check, interval=2.0, max_rps=20.0, workers=4, max_failures=5):
+        self.check = check
+        self.interval = interval
+        self.max_rps = max_rps
+        self.max_failures = max_failures
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="poller")
+        self._tokens = max_rps
+        self._last_refill = time.monotonic()
+        self.polls = 0
+        self._thread = threading.Thread(target=self._run, name="poller-scheduler", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        """Number of jobs waiting for completion"""
+        with self._cond:
+            return len(self._heap)
+
+    def watch(self, request_id, status_url, label=None, on_status=None):
+        """
+        Track a submitted request; label names its job in traces.
+
+        on_status(status_data) is called after every successful check
+        (IN_QUEUE, IN_PROGRESS or COMPLETED), e.g. to report progress.
+
+        Returns:
+            Future: Resolves with the final status data when COMPLETED
+        """
+        future = Future()
+        job = {"request_id": request_id, "status_url": status_url, "future": future, "label": label,
+               "on_status": on_status, "failures": 0}
+        # A random phase within one interval spreads the polls of jobs
+        # submitted together, instead of polling them in lockstep bursts
+        self._schedule(job, time.monotonic() + random.uniform(0, self.interval))
+        return future
+
+    def close(self):
+        """Stop polling; pending futures are cancelled"""
+        with self._cond:
+            self._closed = True
+            pending, self._heap = self._heap, []
+            self._cond.notify_all()
+        for _, _, job in pending:
+            job["future"].cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule(self, job, due):
+        with self._cond:
+            if self._closed:
+                job["future"].cancel()
+                return
+            heapq.heappush(self._heap, (due, next(self._seq), job))
+            self._cond.notify()
+
+    def _take_token(self):
+        # Token bucket: returns 0 if a request may go now, else seconds to wait
+        now = time.monotonic()
+        self._tokens = min(self.max_rps, self._tokens + (now - self._last_refill) * self.max_rps)
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.max_rps
+
+    def _run(self):
+        with self._cond:
+            while not self._closed:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due = self._heap[0][0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                wait = self._take_token()
+                if wait:
+                    self._cond.wait(wait)
+                    continue
+                _, _, job = heapq.heappop(self._heap)
+                self._executor.submit(self._poll, job)
+
+    def _poll(self, job):
+        future = job["future"]
+        if future.cancelled():
+            return
+        error = None
+        try:
+            with tracing.labelled(job["label"]):
+                status_data = self.check(job["status_url"])
+        except StatusError as e:
+            status_data, error = None, e
+        except Exception as e:
+            future.set_exception(e)
+            return
+        with self._cond:
+            self.polls += 1
+
+        if not status_data:
+            if self._retryable(error) and job["failures"] < self.max_failures:
+                # Back on the heap, so the retry waits its turn under the rate cap
+                job["failures"] += 1
+                delay = min(30, self.interval * 2 ** job["failures"]) * random.uniform(0.5, 1.0)
+                self._schedule(job, time.monotonic() + delay)
+                return
+            future.set_exception(error or PollError(f"Failed to get status of {job['request_id']}"))
+            return
+        job["failures"] = 0
+
+        status = status_data.get("status")
+        if status not in ("COMPLETED", "IN_QUEUE", "IN_PROGRESS"):
+            future.set_exception(PollError(f"Unknown status: {status}"))
+            return
+        if job["on_status"]:
+            job["on_status"](status_data)
+        if status == "COMPLETED":
+            future.set_result(status_data)
+        else:
+            self._schedule(job, time.monotonic() + self.interval)
+
+    @staticmethod
+    def _retryable(error):
+        # Transport failures and throttled or 5xx responses; not e.g. a 404 or 401
+        return error is None or error.status_code is None or error.status_code in RETRY_STATUS_CODES
+
+
+def chain(future, executor, fn):
+    """
+    Run fn(result) on executor once future succeeds.
+
+    Returns:
+        Future: Resolves with fn's return value, or with the first error
+    """
+    result = Future()
+
+    def on_done(f):
+        if f.cancelled():
+            result.cancel()
+            return
+        error = f.exception()
+        if error is not None:
+            result.set_exception(error)
+            return
+
+        def run():
+            try:
+                result.set_result(fn(f.result()))
+            except BaseException as e:
+                result.set_exception(e)
+
+        try:
+            executor.submit(run)
+        except RuntimeError as e:
+            result.set_exception(e)
+
+    future.add_done_callback(on_done)
+    return result
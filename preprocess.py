@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Text preprocessing for AI Voices
+
+Runs on every text before it is submitted:
+
+    1. canonicalize() - Unicode NFC, straight quotes, no zero-width
+       characters and collapsed whitespace, so texts that only differ in
+       such details are spoken and cached identically. Anything that can
+       change what is spoken is kept: compatibility characters (x², ½),
+       dashes ("10–20" is a range, "10—20" a pause), the minus sign and
+       primes (5′10″)
+    2. PronunciationDictionary - the house dictionary applied in a single
+       pass with an Aho-Corasick automaton, so the time taken grows with
+       the length of the text, not with the number of entries
+
+A dictionary file has one entry per line:
+
+    # Replaced in the text before submission
+    AWS = A W S
+    nginx = engine x
+
+    # Sent with the request as pronunciation_dict.tone_list entries
+    燕少飞/(yan4)(shao3)(fei1)
+
+Only the tone entries whose term occurs in a text are sent with it.
+Terms made of letters or digits only match whole words; where several
+terms match, the leftmost and then longest wins. The compiled automaton
+is cached on disk, keyed by the file's contents.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+
+COMPILED_DIR = os.environ.get(
+    "AI_VOICES_DICTIONARY_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "ai-voices", "dictionaries"),
+)
+
+# Bumped whenever the compiled format or the matching rules change
+_FORMAT_VERSION = 3
+
+# Only variants that are never pronounced differently
+_PUNCTUATION = str.maketrans({
+    "‘": "'", "’": "'", "‚": "'", "‛": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"',
+    "«": '"', "»": '"',
+    "​": None, "‌": None, "⁠": None, "﻿": None, "­": None,
+})
+_SPACES = re.compile(r"[^\S\n]+")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r" (?=[,.;:!?])")
+_LINE_EDGES = re.compile(r" ?\n ?")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def canonicalize(text):
+    """Return the canonical form of a text: same speech, same cache key"""
+    text = unicodedata.normalize("NFC", text).translate(_PUNCTUATION)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _SPACES.sub(" ", text)
+    text = _SPACE_BEFORE_PUNCTUATION.sub("", text)
+    text = _LINE_EDGES.sub("\n", text)
+    text = _BLANK_LINES.sub("\n\n", text)
+    return text.strip()
+
+
+def _is_word(char):
+    # Letters and digits of space-separated scripts; CJK terms match anywhere
+    return char.isalnum() and ord(char) < 0x2E80
+
+
+def parse_dictionary(text):
+    """
+    Parse a dictionary file.
+
+    Returns:
+        list: (term, replacement or None, tone entry or None) tuples
+
+    Raises:
+        ValueError: On a line that is neither "term = replacement" nor "term/pronunciation"
+    """
+    entries = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        replacement = pronunciation = None
+        if "=" in line:
+            term, replacement = line.split("=", 1)
+            replacement = canonicalize(replacement)
+        elif "/" in line:
+            term, pronunciation = line.rsplit("/", 1)
+            pronunciation = pronunciation.strip()
+        else:
+            term = ""
+        term = canonicalize(term)
+        if not term or pronunciation == "":
+            raise ValueError(f"Line {number}: expected \"term = replacement\" or \"term/pronunciation\", got {line[:40]!r}")
+        tone = f"{term}/{pronunciation}" if pronunciation else None
+        # A later entry for the same term overrides an earlier one
+        entries[term] = (term, replacement, tone)
+    return list(entries.values())
+
+
+def _compile(entries):
+    """Build the Aho-Corasick automaton: goto maps, failure links and outputs per state"""
+    goto = [{}]
+    outputs = [[]]
+    for index, (term, _, _) in enumerate(entries):
+        state = 0
+        for char in term:
+            next_state = goto[state].get(char)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][char] = next_state
+                goto.append({})
+                outputs.append([])
+            state = next_state
+        outputs[state].append(index)
+
+    # Breadth-first failure links; each state also inherits the outputs of its
+    # failure state, so a scan never has to follow output links
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, child in goto[state].items():
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[child] = goto[fallback].get(char, 0)
+            outputs[child].extend(outputs[fail[child]])
+            queue.append(child)
+
+    lengths = [len(term) for term, _, _ in entries]
+    outputs = [tuple(sorted(out, key=lambda i: -lengths[i])) for out in outputs]
+    return {"goto": goto, "fail": fail, "outputs": outputs, "lengths": lengths}
+
+
+class PronunciationDictionary:
+    """
+    Compiled pronunciation dictionary.
+
+    Args:
+        entries: (term, replacement or None, tone entry or None) tuples, as
+            returned by parse_dictionary
+        automaton: Precompiled automaton for these entries (default: compiled here)
+        fingerprint: Hash of the source file, set by load()
+    """
+
+    def __init__(self, entries, automaton=None, fingerprint=None):
+        self.entries = entries
+        self.fingerprint = fingerprint
+        automaton = automaton or _compile(entries)
+        self._goto = automaton["goto"]
+        self._fail = automaton["fail"]
+        self._outputs = automaton["outputs"]
+        self._lengths = automaton["lengths"]
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, path, compiled_dir=COMPILED_DIR):
+        """
+        Load a dictionary file, reusing its compiled automaton from compiled_dir.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is malformed
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        fingerprint = hashlib.sha256(data + f"\0{_FORMAT_VERSION}".encode()).hexdigest()
+        compiled_path = os.path.join(compiled_dir, f"{fingerprint[:32]}.json") if compiled_dir else None
+
+        if compiled_path:
+            try:
+                with open(compiled_path, encoding="utf-8") as f:
+                    compiled = json.load(f)
+                entries = [tuple(entry) for entry in compiled["entries"]]
+                return cls(entries, compiled["automaton"], fingerprint)
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+        entries = parse_dictionary(data.decode("utf-8"))
+        dictionary = cls(entries, fingerprint=fingerprint)
+        if compiled_path:
+            try:
+                os.makedirs(compiled_dir, exist_ok=True)
+                tmp_path = f"{compiled_path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"entries": entries, "automaton": dictionary._automaton()}, f,
+                              ensure_ascii=False, separators=(",", ":"))
+                os.replace(tmp_path, compiled_path)
+            except OSError:
+                pass
+        return dictionary
+
+    def _automaton(self):
+        return {"goto": self._goto, "fail": self._fail, "outputs": self._outputs, "lengths": self._lengths}
+
+    def matches(self, text):
+        """Return the non-overlapping (start, end, entry index) matches, leftmost-longest first"""
+        goto, fail, outputs, lengths = self._goto, self._fail, self._outputs, self._lengths
+        size = len(text)
+        longest = {}
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            end = position + 1
+            for index in outputs[state]:
+                start = end - lengths[index]
+                # Whole words only where the term itself starts or ends with a word character
+                if start > 0 and _is_word(text[start]) and _is_word(text[start - 1]):
+                    continue
+                if end < size and _is_word(text[end - 1]) and _is_word(text[end]):
+                    continue
+                if start not in longest or longest[start][0] < end:
+                    longest[start] = (end, index)
+
+        found = []
+        cursor = 0
+        for start in sorted(longest):
+            if start >= cursor:
+                end, index = longest[start]
+                found.append((start, end, index))
+                cursor = end
+        return found
+
+    def apply(self, text):
+        """
+        Apply the dictionary to a canonical text in one pass.
+
+        Returns:
+            tuple: (text with replacements, tone_list entries for the terms found,
+                number of replacements)
+        """
+        parts = []
+        tone_list = []
+        replacements = 0
+        cursor = 0
+        for start, end, index in self.matches(text):
+            _, replacement, tone = self.entries[index]
+            if replacement is not None:
+                parts.append(text[cursor:start])
+                parts.append(replacement)
+                cursor = end
+                replacements += 1
+            elif tone not in tone_list:
+                tone_list.append(tone)
+        parts.append(text[cursor:])
+        return "".join(parts), tone_list, replacements
+
+
+class TextPreprocessor:
+    """
+    Canonicalization plus an optional pronunciation dictionary.
+
+    Calling it returns (text to submit, tone_list entries, stats dict).
+    """
+
+    def __init__(self, dictionary=None):
+        self.dictionary = dictionary
+
+    @property
+    def fingerprint(self):
+        """Identifies the dictionary, for keys of results that depend on it"""
+        return self.dictionary.fingerprint if self.dictionary is not None else None
+
+    def __call__(self, text):
+        started = time.perf_counter()
+        text = canonicalize(text)
+        tone_list, replacements = [], 0
+        if self.dictionary is not None:
+            text, tone_list, replacements = self.dictionary.apply(text)
+        stats = {"replacements": replacements, "ms": 1000 * (time.perf_counter() - started)}
+        return text, tone_list, stats
+
+
+def env_preprocessor():
+    """Preprocessor with the dictionary named by AI_VOICES_PRONUNCIATIONS, if set
+
+    Raises:
+        OSError: If the dictionary cannot be read
+        ValueError: If the dictionary is malformed
+    """
+    path = os.environ.get("AI_VOICES_PRONUNCIATIONS")
+    return TextPreprocessor(PronunciationDictionary.load(path) if path else None)
+
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Compile a pronunciation dictionary and preview its effect")
+    parser.add_argument("dictionary", help="Dictionary file")
+    parser.add_argument("--text", type=str, help="Text to preprocess (default: stdin)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        dictionary = PronunciationDictionary.load(args.dictionary)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"📖 {len(dictionary)} entries loaded in {1000 * (time.perf_counter() - started):.0f} ms", file=sys.stderr)
+
+    text, tone_list, stats = TextPreprocessor(dictionary)(args.text if args.text is not None else sys.stdin.read())
+    print(text)
+    print(f"📖 {stats['replacements']} replacements, {len(tone_list)} pronunciations, {stats['ms']:.1f} ms",
+          file=sys.stderr)
+    for tone in tone_list:
+        print(f"   {tone}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
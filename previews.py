@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Voice preview cache for AI Voices
+
+Keeps one short sample clip per voice in voices.py so the voice selectors
+can play a preview instantly instead of a full paid generate-and-listen
+round trip. Previews are generated in the background with bounded
+concurrency, expire after a TTL, and are only regenerated when a voice is
+new or changed.
+
+Usage:
+    python previews.py            # warm the cache (generates missing previews)
+    python previews.py --list     # show cached previews
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from client import SpeechClient, SpeechError
+from scheduler import env_slot
+from voices import CUSTOM_VOICES, ALL_VOICE_IDS
+
+PREVIEW_TEXT = "Hello! This is a short preview of my voice."
+DEFAULT_TTL = 30 * 24 * 3600
+CACHE_DIR = os.environ.get(
+    "AI_VOICES_PREVIEW_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ai-voices", "previews"),
+)
+
+# Players tried in order; each gets the preview path appended
+PLAYERS = [
+    ["afplay"],
+    ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet"],
+    ["mpg123", "-q"],
+    ["mpv", "--really-quiet"],
+]
+
+
+def _fingerprint(voice_id, text=PREVIEW_TEXT):
+    """Hash of everything that changes what a voice's preview sounds like"""
+    data = json.dumps({"voice_id": voice_id, "name": CUSTOM_VOICES.get(voice_id, voice_id), "text": text})
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+class PreviewCache:
+    """
+    On-disk cache of one preview clip per voice.
+
+    Clip names include a fingerprint of the voice config, so a changed
+    voice simply misses the cache; the file's age is checked against the TTL.
+
+    Args:
+        cache_dir: Directory holding the clips
+        ttl: Seconds before a preview is considered stale
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _prefix(self, voice_id):
+        return "".join(c if c.isalnum() else "_" for c in voice_id) + "-"
+
+    def path_for(self, voice_id):
+        """Where the preview clip for a voice is stored"""
+        return os.path.join(self.cache_dir, f"{self._prefix(voice_id)}{_fingerprint(voice_id)}.mp3")
+
+    def get(self, voice_id):
+        """Return the path of a fresh cached preview, or None"""
+        path = self.path_for(voice_id)
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return None
+        return path if age <= self.ttl else None
+
+    def stale_voices(self, voice_ids=None):
+        """Voices whose preview is missing, expired, or was made for an older config"""
+        return [v for v in (voice_ids or ALL_VOICE_IDS) if self.get(v) is None]
+
+    def _partial_path(self, voice_id):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return self.path_for(voice_id) + ".part"
+
+    def _store(self, voice_id, partial_path):
+        """Move a finished clip into place and drop clips of older versions of the voice"""
+        if not os.path.exists(partial_path):
+            return None
+        path = self.path_for(voice_id)
+        os.replace(partial_path, path)
+
+        prefix = self._prefix(voice_id)
+        for name in os.listdir(self.cache_dir):
+            old_path = os.path.join(self.cache_dir, name)
+            if name.startswith(prefix) and old_path != path:
+                os.remove(old_path)
+        return path
+
+    def generate(self, voice_id, api_key):
+        """Generate and store the preview for one voice. Returns its path or None."""
+        partial_path = self._partial_path(voice_id)
+        client = SpeechClient(api_key, job_slot=env_slot)
+        try:
+            client.generate(PREVIEW_TEXT, voice_id, partial_path, priority="bulk")
+        except (SpeechError, OSError):
+            return None
+        return self._store(voice_id, partial_path)
+
+    def warm(self, api_key, voice_ids=None, max_workers=2, on_ready=None):
+        """
+        Generate every stale preview in the background.
+
+        Args:
+            api_key: fal.ai API key
+            voice_ids: Voices to warm (default: every voice in voices.py)
+            max_workers: Maximum previews generated at once
+            on_ready: Optional callback(voice_id, path_or_None) per finished voice
+
+        Returns:
+            PreviewWarmer: Handle to join() or cancel() the warm-up
+        """
+        return PreviewWarmer(self, api_key, self.stale_voices(voice_ids), max_workers, on_ready)
+
+
+class PreviewWarmer:
+    """
+    Previews being generated in the background.
+
+    cancel() drops the previews not started yet and cancels the running
+    ones upstream, so a short-lived process does not wait for (or pay for)
+    the rest of the warm-up when it exits.
+    """
+
+    def __init__(self, cache, api_key, voice_ids, max_workers=2, on_ready=None):
+        self.cache = cache
+        self.on_ready = on_ready
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preview")
+        self._client = SpeechClient(api_key, executor=self._executor, job_slot=env_slot)
+        self._remaining = len(voice_ids)
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        if not voice_ids:
+            self._finished.set()
+        self._jobs = []
+        for voice_id in voice_ids:
+            partial_path = cache._partial_path(voice_id)
+            job = self._client.submit(PREVIEW_TEXT, voice_id, partial_path, priority="bulk")
+            job.add_done_callback(lambda job, v=voice_id, p=partial_path: self._done(v, p, job))
+            self._jobs.append(job)
+
+    def _done(self, voice_id, partial_path, job):
+        path = None
+        try:
+            job.result()
+            path = self.cache._store(voice_id, partial_path)
+        except (SpeechError, OSError, CancelledError):
+            with contextlib.suppress(OSError):
+                os.remove(partial_path)
+        if self.on_ready and not job.cancelled:
+            self.on_ready(voice_id, path)
+        with self._lock:
+            self._remaining -= 1
+            if self._remaining == 0:
+                self._finished.set()
+
+    def join(self, timeout=None):
+        """Wait until every preview is generated (or failed)"""
+        return self._finished.wait(timeout)
+
+    def cancel(self):
+        """Stop warming: queued previews never start, running ones are cancelled upstream"""
+        for job in self._jobs:
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def previews_enabled():
+    """Background warming can be switched off with AI_VOICES_PREVIEWS=off"""
+    return os.environ.get("AI_VOICES_PREVIEWS", "on").lower() not in ("0", "off", "false", "no")
+
+
+def play_preview(path):
+    """Play a preview clip with the first available player. Returns True if started."""
+    for player in PLAYERS:
+        if shutil.which(player[0]):
+            subprocess.Popen(
+                player + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm or inspect the voice preview cache")
+    parser.add_argument("--list", action="store_true", help="List cached previews and exit")
+    parser.add_argument("--workers", type=int, default=2, help="Previews generated at once (default: 2)")
+    parser.add_argument("--api-key", type=str, help="fal.ai API key (or set FAL_KEY environment variable)")
+    args = parser.parse_args()
+
+    cache = PreviewCache()
+
+    if args.list:
+        for voice_id in ALL_VOICE_IDS:
+            path = cache.get(voice_id)
+            print(f"{'🔊' if path else '  '} {CUSTOM_VOICES.get(voice_id, voice_id):<20} {path or '(not cached)'}")
+        return
+
+    api_key = args.api_key or os.environ.get("FAL_KEY")
+    if not api_key:
+        print("❌ Error: API key required")
+        print("   Either use --api-key flag or set FAL_KEY environment variable")
+        sys.exit(1)
+
+    stale = cache.stale_voices()
+    if not stale:
+        print("✅ All previews are up to date")
+        return
+
+    print(f"🔄 Generating {len(stale)} preview(s) into {cache.cache_dir}...")
+
+    def report(voice_id, path):
+        name = CUSTOM_VOICES.get(voice_id, voice_id)
+        print(f"   {'✅' if path else '❌'} {name}")
+
+    cache.warm(api_key, stale, args.workers, on_ready=report).join()
+
+
+if __name__ == "__main__":
+    main()
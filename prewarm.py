@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Connection pre-warming for AI Voices
+
+While the user is still choosing a voice or typing, a background thread
+opens keep-alive connections to the queue and CDN hosts through the same
+requests.Session that will submit and download the job, so the first
+submit and download skip DNS, TCP and TLS setup. Idle connections are
+refreshed every interval seconds, before servers drop them.
+
+The TUIs start a ConnectionWarmer on their SpeechClient's session as soon
+as they open, so the first job submitted in-process is already warm. Result
+URLs have been served from more than one CDN host, so both are warmed, and
+a long-running app also warms the host of every audio URL it downloads.
+"""
+import os
+import threading
+from urllib.parse import urlsplit
+
+# Hosts the generated audio is downloaded from - FAL_CDN_URL replaces them with one host
+CDN_URLS = (
+    [os.environ["FAL_CDN_URL"].rstrip("/")] if os.environ.get("FAL_CDN_URL")
+    else ["https://fal.media", "https://v3.fal.media"]
+)
+
+
+def origins(*urls):
+    """Return the distinct scheme://host[:port] origins of some URLs"""
+    seen = []
+    for url in urls:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if parts.netloc and origin not in seen:
+            seen.append(origin)
+    return seen
+
+
+class ConnectionWarmer:
+    """
+    Keeps pooled connections to a few origins open in the background.
+
+    Args:
+        session: requests.Session whose connection pool is warmed
+        urls: URLs whose origins are warmed
+        interval: Seconds between refreshes of the idle connections
+    """
+
+    def __init__(self, session, urls, interval=30, timeout=5):
+        self.session = session
+        self.origins = origins(*urls)
+        self.interval = interval
+        self.timeout = timeout
+        self.warmed = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="prewarm", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop refreshing; warmed connections stay in the session's pool"""
+        self._stop.set()
+        self._wake.set()
+
+    def add(self, url):
+        """Also keep the origin of url warm, e.g. the host a result was actually downloaded from"""
+        with self._lock:
+            new = [origin for origin in origins(url) if origin not in self.origins]
+            self.origins.extend(new)
+        if new:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                current = list(self.origins)
+            for origin in current:
+                if self._stop.is_set():
+                    return
+                try:
+                    # Any response will do - only the open connection matters
+                    self.session.head(origin + "/", timeout=self.timeout).close()
+                    self.warmed.add(origin)
+                except Exception:
+                    pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
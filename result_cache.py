@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Tiered result cache for AI Voices
+
+Looks up generated audio before paying for a generation, tier by tier:
+
+    1. MemoryTier - in-process LRU (long-running TUI or batch)
+    2. DiskTier   - local directory with a size cap
+    3. HTTPTier   - shared store over plain HTTP/WebDAV GET and PUT
+                    (also S3-compatible buckets that accept such requests)
+
+A hit in a lower tier is promoted to the tiers above it, and new results
+are written through to every tier, so a clip rendered on one host is free
+on every other host that shares the store. Each tier keeps its own hit,
+miss and eviction counts.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "AI_VOICES_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ai-voices", "results"),
+)
+
+
+def cache_key(text, voice_id, settings=None):
+    """Content key of one generation: text, voice and every setting that affects audio"""
+    data = json.dumps({"text": text, "voice_id": voice_id, "settings": settings or {}}, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class _Tier:
+    name = "tier"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        data = self._get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def put(self, key, data):
+        self._put(key, data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "tier": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+class MemoryTier(_Tier):
+    """In-process LRU bounded by total bytes"""
+
+    name = "memory"
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+
+    def _get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def _put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+
+class DiskTier(_Tier):
+    """
+    Local directory of <key>.mp3 files, least recently used evicted first.
+
+    The directory is scanned once, when the tier is created; after that an
+    in-memory LRU index of file sizes and a running total decide evictions,
+    so storing a clip costs the same however large the cache grows.
+    """
+
+    name = "disk"
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=1024 * 1024 * 1024):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()
+        self._size = 0
+        self._scan()
+
+    def _scan(self):
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            if not name.endswith(".mp3"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._size += size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            else:
+                # Written by another process since the scan
+                self._index[key] = len(data)
+                self._size += len(data)
+        # Touch on hit so the next scan sees recency of use, not of creation; another
+        # process may have evicted the file since, which doesn't spoil the hit
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _put(self, key, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        # Called with the lock held: drop least recently used clips until under the cap
+        while self._size > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                # Already removed by another process sharing the directory
+                continue
+            self.evictions += 1
+
+
+class HTTPTier(_Tier):
+    """
+    Shared store reached with GET/PUT {base_url}/{key}.mp3.
+
+    Eviction is left to the store. Network errors count as misses, so an
+    unreachable store degrades to the local tiers instead of failing jobs.
+    Requests go through session - pass the SpeechClient's transport to share
+    its pooled (and pre-warmed) connections.
+    """
+
+    name = "shared"
+
+    def __init__(self, base_url, headers=None, timeout=10, session=None):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def _url(self, key):
+        return f"{self.base_url}/{key}.mp3"
+
+    def _get(self, key):
+        try:
+            response = self.session.request("GET", self._url(key), headers=self.headers, timeout=self.timeout)
+        except requests.RequestException:
+            with self._lock:
+                self.errors += 1
+            return None
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    def _put(self, key, data):
+        try:
+            response = self.session.request(
+                "PUT", self._url(key), data=data, timeout=self.timeout,
+                headers={**self.headers, "Content-Type": "audio/mpeg"},
+            )
+            ok = response.status_code in (200, 201, 204)
+        except requests.RequestException:
+            ok = False
+        if not ok:
+            with self._lock:
+                self.errors += 1
+
+
+class TieredCache:
+    """Looks up tiers in order, promoting hits to the faster tiers above"""
+
+    def __init__(self, tiers):
+        self.tiers = tiers
+
+    def get(self, key):
+        """Return cached audio bytes, or None"""
+        for index, tier in enumerate(self.tiers):
+            data = tier.get(key)
+            if data is not None:
+                for upper in self.tiers[:index]:
+                    upper.put(key, data)
+                return data
+        return None
+
+    def put(self, key, data):
+        """Store audio bytes in every tier"""
+        for tier in self.tiers:
+            tier.put(key, data)
+
+    def report(self):
+        """Return per-tier hit rates and evictions"""
+        lines = ["🗄️  Result cache"]
+        for tier in self.tiers:
+            s = tier.stats()
+            lines.append(
+                f"   {s['tier']:<7} hits: {s['hits']:5}  misses: {s['misses']:5}  "
+                f"hit rate: {100 * s['hit_rate']:5.1f}%  evictions: {s['evictions']:4}  errors: {s['errors']}"
+            )
+        return "\n".join(lines)
+
+
+def build_cache(memory_mb=64, cache_dir=DEFAULT_CACHE_DIR, disk_mb=1024, shared_url=None, shared_headers=None,
+                session=None):
+    """Create the standard memory -> disk -> shared tier stack; session carries the shared tier's requests"""
+    tiers = [MemoryTier(memory_mb * 1024 * 1024), DiskTier(cache_dir, disk_mb * 1024 * 1024)]
+    if shared_url:
+        tiers.append(HTTPTier(shared_url, shared_headers, session=session))
+    return TieredCache(tiers)
+
+
+def env_cache(session=None):
+    """
+    Cache stack for the TUIs, opted into like the command line's --cache:
+    AI_VOICES_CACHE=on enables it, and AI_VOICES_SHARED_CACHE (like
+    --shared-cache) implies it. AI_VOICES_CACHE_DIR and
+    AI_VOICES_SHARED_CACHE_TOKEN configure it.
+
+    Returns None unless caching is enabled.
+    """
+    shared_url = os.environ.get("AI_VOICES_SHARED_CACHE")
+    enabled = os.environ.get("AI_VOICES_CACHE", "off").lower() in ("1", "on", "true", "yes")
+    if not (enabled or shared_url):
+        return None
+    token = os.environ.get("AI_VOICES_SHARED_CACHE_TOKEN")
+    return build_cache(
+        shared_url=shared_url,
+        shared_headers={"Authorization": f"Bearer {token}"} if token else None,
+        session=session,
+    )
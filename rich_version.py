@@ -19,6 +19,12 @@ from pathlib import Path
 
 # Import voice data from voices.py
 from voices import CUSTOM_VOICES, BUILTIN_VOICES, ALL_VOICE_IDS
+from previews import PreviewCache, previews_enabled, play_preview
+from client import SpeechClient, SpeechError, describe_event
+from prewarm import CDN_URLS, ConnectionWarmer
+from preprocess import env_preprocessor
+from result_cache import env_cache
+from scheduler import env_slot
 
 
 console = Console()
@@ -54,7 +60,7 @@ def get_api_key():
     return api_key
 
 
-def select_voice():
+def select_voice(previews=None):
     """Interactive voice selection using Rich"""
     console.print("\n[bold]🎤 SELECT A VOICE[/bold]\n")
 
@@ -63,6 +69,10 @@ def select_voice():
     table.add_column("#", style="dim", width=4)
     table.add_column("Voice", style="cyan")
     table.add_column("Type", style="green", width=15)
+    table.add_column("Preview", width=8)
+
+    def preview_cell(voice_id):
+        return "[green]🔊[/]" if previews and previews.get(voice_id) else "[dim]-[/]"
 
     voice_options = []
     option_num = 1
@@ -74,7 +84,8 @@ def select_voice():
             table.add_row(
                 str(option_num),
                 f"[bold]{display_name}[/]",
-                "[yellow]Custom[/]"
+                "[yellow]Custom[/]",
+                preview_cell(voice_id),
             )
             voice_options.append(("custom", voice_id, display_name))
             option_num += 1
@@ -85,18 +96,25 @@ def select_voice():
         table.add_row(
             str(option_num),
             f"[cyan]{voice}[/]",
-            "[blue]Built-in[/]"
+            "[blue]Built-in[/]",
+            preview_cell(voice),
         )
         voice_options.append(("built-in", voice, voice))
         option_num += 1
 
     console.print(table)
 
+    numbers = [str(i) for i in range(1, len(voice_options) + 1)]
+    preview_choices = [f"p{n}" for n in numbers] if previews else []
+    if previews:
+        console.print("[dim]Enter [bold]p<number>[/bold] (e.g. p3) to hear a cached preview first.[/]")
+
     # Selection prompt
     while True:
         choice = Prompt.ask(
             "\n[bold]Select a voice[/bold]",
-            choices=[str(i) for i in range(1, len(voice_options) + 1)] + ["q"],
+            choices=numbers + preview_choices + ["q"],
+            show_choices=not previews,
             default="1"
         )
 
@@ -104,6 +122,17 @@ def select_voice():
             console.print("[yellow]Cancelled[/]")
             return None
 
+        if choice in preview_choices:
+            _, voice_id, display_name = voice_options[int(choice[1:]) - 1]
+            path = previews.get(voice_id)
+            if not path:
+                console.print(f"[yellow]⏳ No preview cached for {display_name} yet[/]")
+            elif play_preview(path):
+                console.print(f"[green]🔊 Playing preview of {display_name}[/]")
+            else:
+                console.print(f"[green]🔊 Preview of {display_name}:[/] {path}")
+            continue
+
         try:
             idx = int(choice) - 1
             if 0 <= idx < len(voice_options):
@@ -138,8 +167,8 @@ def get_text_input():
     return text
 
 
-def show_generation_status(voice_id, text):
-    """Show generation in progress with rich formatting"""
+def show_generation_status(client, voice_id, text, cache=None):
+    """Run the generation in-process, showing its progress. Returns the output path."""
     console.print("\n[bold]🚀 GENERATION IN PROGRESS[/bold]\n")
 
     # Status panel
@@ -152,15 +181,28 @@ def show_generation_status(voice_id, text):
     )
     console.print(status_panel)
 
-    # Spinner
+    # Spinner, updated from the job's progress events
     with Progress(
         SpinnerColumn(),
         TextColumn("[bold blue]{task.description}"),
         console=console,
     ) as progress:
-        task = progress.add_task("Generating speech...", total=None)
-        # Note: In a real implementation, you'd hook into the actual generation process
-        # For now, we'll just show the spinner
+        task = progress.add_task("Submitting request...", total=None)
+
+        def on_progress(event):
+            description = describe_event(event)
+            if description:
+                progress.update(task, description=description)
+
+        job = client.submit(
+            text, voice_id, display_name=CUSTOM_VOICES.get(voice_id, voice_id),
+            cache=cache, on_progress=on_progress, priority="interactive",
+        )
+        try:
+            return job.result()
+        except KeyboardInterrupt:
+            job.cancel()
+            raise
 
 
 def confirm_generate():
@@ -170,6 +212,7 @@ def confirm_generate():
 
 def main():
     """Main application loop"""
+    warmer = None
     try:
         # Show welcome
         show_welcome()
@@ -179,8 +222,20 @@ def main():
         if not api_key:
             return 1
 
-        # Select voice
-        voice_id = select_voice()
+        # Jobs run in-process; open connections while the user chooses and types
+        client = SpeechClient(api_key, job_slot=env_slot, preprocessor=env_preprocessor())
+        warmer = ConnectionWarmer(client.transport, [client.queue_url, *CDN_URLS]).start()
+
+        # Warm voice previews in the background while the user chooses
+        previews = PreviewCache()
+        preview_warmer = previews.warm(api_key) if previews_enabled() else None
+
+        # Select voice; the remaining previews are not worth waiting for after that
+        try:
+            voice_id = select_voice(previews)
+        finally:
+            if preview_warmer:
+                preview_warmer.cancel()
         if not voice_id:
             return 0
 
@@ -194,31 +249,19 @@ def main():
             console.print("[yellow]Generation cancelled[/]")
             return 0
 
-        # Show generation status
-        show_generation_status(voice_id, text)
-
-        # Call the actual generation function
-        console.print("\n[bold cyan]🚀 Calling CLI to generate...[/]\n")
-
-        import subprocess
-        result = subprocess.run(
-            [sys.executable, "main.py", "--voice", voice_id, "--text", text],
-            capture_output=True,
-            text=True,
-            env={**os.environ, "FAL_KEY": api_key},
-        )
-
-        # Display the result
-        if result.returncode == 0:
-            console.print("[bold green]✅ Generation Successful![/]")
-            console.print()
-            console.print(result.stdout)
-        else:
+        # Generate, showing progress
+        try:
+            output_file = show_generation_status(client, voice_id, text, env_cache(client.transport))
+        except (SpeechError, ValueError) as e:
             console.print("[bold red]❌ Generation Failed![/]")
             console.print()
-            console.print(f"[red]{result.stderr}[/]")
+            console.print(f"[red]{e}[/]")
+            return 1
 
-        return result.returncode
+        console.print("[bold green]✅ Generation Successful![/]")
+        console.print()
+        console.print(f"🎉 Your audio file is ready at: [bold]{output_file}[/]")
+        return 0
 
     except KeyboardInterrupt:
         console.print("\n[yellow]Cancelled by user[/]")
@@ -226,6 +269,9 @@ def main():
     except Exception as e:
         console.print(f"\n[red bold]Error: {str(e)}[/]")
         return 1
+    finally:
+        if warmer:
+            warmer.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Priority-aware local scheduler for AI Voices
+
+Limits how many jobs talk to the upstream queue at once and decides who
+goes next: interactive work jumps ahead of normal and bulk work that has
+not been submitted yet. Each class can reserve slots, so bulk jobs keep
+making progress and interactive jobs find a slot even while a batch
+saturates the rest.
+
+A scheduler hosted by one process (e.g. a nightly --stream batch) can be
+shared with others (e.g. the TUIs) over HTTP with SchedulerServer and
+remote_slot().
+"""
+import itertools
+import json
+import os
+import select
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+import tracing
+from hedging import percentile
+from local_server import LocalServer, QuietHandler
+
+# Highest priority first
+PRIORITIES = ["interactive", "normal", "bulk"]
+
+DEFAULT_RESERVATIONS = {"interactive": 1, "normal": 0, "bulk": 1}
+
+
+def parse_reservations(spec):
+    """Parse "interactive=2,bulk=1" into a reservation dict"""
+    reservations = dict.fromkeys(PRIORITIES, 0)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, count = part.partition("=")
+        if name not in reservations:
+            raise ValueError(f"Unknown priority class: {name}")
+        reservations[name] = int(count)
+    return reservations
+
+
+class PriorityScheduler:
+    """
+    Slot scheduler with priority classes and per-class reservations.
+
+    Args:
+        slots: Total number of concurrent jobs
+        reservations: Slots held back for each class; the remaining slots
+            are shared and go to the highest-priority waiter
+    """
+
+    def __init__(self, slots=4, reservations=None):
+        self.reservations = dict(DEFAULT_RESERVATIONS if reservations is None else reservations)
+        for name in PRIORITIES:
+            self.reservations.setdefault(name, 0)
+        reserved = sum(self.reservations.values())
+        if reserved > slots:
+            raise ValueError(f"Reservations ({reserved}) exceed available slots ({slots})")
+
+        self.slots = slots
+        self._shared = slots - reserved
+        self._lock = threading.Lock()
+        self._waiting = {name: deque() for name in PRIORITIES}
+        self._running = dict.fromkeys(PRIORITIES, 0)
+        self._waits = {name: [] for name in PRIORITIES}
+
+    def _check(self, priority):
+        if priority not in self._waiting:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+    def _shared_in_use(self):
+        return sum(max(0, self._running[n] - self.reservations[n]) for n in PRIORITIES)
+
+    def _can_run(self, priority):
+        if self._running[priority] < self.reservations[priority]:
+            return True
+        return self._shared_in_use() < self._shared
+
+    def _dispatch(self):
+        # Called with the lock held: grant slots to head waiters, best class first
+        for name in PRIORITIES:
+            queue = self._waiting[name]
+            while queue and self._can_run(name):
+                ticket = queue.popleft()
+                self._running[name] += 1
+                ticket["granted"] = time.time()
+                ticket["event"].set()
+
+    def _enqueue(self, priority):
+        """Join the queue without waiting. Returns the ticket; its event is set once granted."""
+        self._check(priority)
+        ticket = {"event": threading.Event(), "queued": time.time(), "granted": None}
+        with self._lock:
+            self._waiting[priority].append(ticket)
+            self._dispatch()
+        return ticket
+
+    def _granted(self, priority, ticket):
+        """Record the queue wait of a granted ticket and return it"""
+        wait = ticket["granted"] - ticket["queued"]
+        with self._lock:
+            self._waits[priority].append(wait)
+        return wait
+
+    def _withdraw(self, priority, ticket):
+        """Leave the queue, giving the slot back if the ticket was already granted"""
+        with self._lock:
+            if ticket["granted"] is None:
+                self._waiting[priority].remove(ticket)
+                return
+            self._running[priority] -= 1
+            self._dispatch()
+
+    def acquire(self, priority="normal"):
+        """Block until a slot is granted. Returns the queue wait in seconds."""
+        ticket = self._enqueue(priority)
+        with tracing.span("scheduler_wait", priority=priority):
+            ticket["event"].wait()
+        return self._granted(priority, ticket)
+
+    def try_acquire(self, priority="normal"):
+        """Take a slot only if one is free now and nobody is waiting for one. Returns True if taken."""
+        self._check(priority)
+        with self._lock:
+            if any(self._waiting.values()) or not self._can_run(priority):
+                return False
+            self._running[priority] += 1
+            return True
+
+    def release(self, priority="normal"):
+        """Give a slot back"""
+        self._check(priority)
+        with self._lock:
+            self._running[priority] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority="normal"):
+        """Hold a slot for the duration of a with-block"""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def report(self):
+        """Return per-class queue wait statistics"""
+        with self._lock:
+            lines = ["🚦 Scheduler queue wait"]
+            for name in PRIORITIES:
+                waits = self._waits[name]
+                if not waits:
+                    continue
+                lines.append(
+                    f"   {name:<12} jobs: {len(waits):4}  "
+                    f"p50: {percentile(waits, 50):6.2f}s  p95: {percentile(waits, 95):6.2f}s  "
+                    f"max: {max(waits):6.2f}s"
+                )
+            return "\n".join(lines)
+
+
+class SchedulerServer(LocalServer):
+    """
+    Shares a PriorityScheduler with other processes over HTTP.
+
+    POST /acquire?priority=<class>&wait=<seconds> queues for a slot and
+    returns a lease ID once it is granted. If none is granted within the
+    wait, it returns a ticket ID instead; POST /acquire?ticket=<id> waits
+    again without losing the place in the queue. POST /release?lease=<id>
+    gives a slot back. Holders renew their lease with POST /renew?lease=<id>;
+    a lease not renewed, or a ticket not polled, within lease_ttl seconds
+    (e.g. a crashed client) expires. A slot granted to a client that hung
+    up while waiting is released at once.
+    """
+
+    thread_name = "scheduler-server"
+
+    def __init__(self, scheduler, host="127.0.0.1", port=0, lease_ttl=30):
+        self.scheduler = scheduler
+        self.lease_ttl = lease_ttl
+        self._leases = {}
+        self._tickets = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        server = self
+
+        class Handler(QuietHandler):
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                try:
+                    if parsed.path == "/acquire":
+                        body = server._acquire(
+                            query.get("priority", ["normal"])[0],
+                            query.get("ticket", [None])[0],
+                            float(query.get("wait", [server.lease_ttl / 2])[0]),
+                            self.connection,
+                        )
+                        if body is None:
+                            self.close_connection = True
+                            return
+                    elif parsed.path == "/renew":
+                        body = server._renew(query.get("lease", [""])[0])
+                    elif parsed.path == "/release":
+                        body = server._release(query.get("lease", [""])[0])
+                    else:
+                        self.send_response(404)
+                        self.end_headers()
+                        return
+                except ValueError as e:
+                    body, code = {"detail": str(e)}, 400
+                else:
+                    code = 200
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._serve(Handler, host, port)
+
+    def _expire_leases(self):
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, t) in self._leases.items() if now - t > self.lease_ttl]
+            priorities = [self._leases.pop(k)[0] for k in expired]
+            abandoned = [k for k, (_, _, t) in self._tickets.items() if now - t > self.lease_ttl]
+            tickets = [self._tickets.pop(k)[:2] for k in abandoned]
+        for priority in priorities:
+            self.scheduler.release(priority)
+        for priority, ticket in tickets:
+            self.scheduler._withdraw(priority, ticket)
+
+    def _acquire(self, priority, ticket_id=None, wait=None, connection=None):
+        self._expire_leases()
+        # Never hold a request longer than an unpolled ticket is kept
+        wait = min(wait if wait is not None else self.lease_ttl, self.lease_ttl / 2)
+        with self._lock:
+            entry = self._tickets.get(ticket_id)
+            if entry:
+                priority, ticket, _ = entry
+            else:
+                # A new request, or a ticket that already expired: join the back of the queue
+                ticket = self.scheduler._enqueue(priority)
+                ticket_id = str(next(self._ids))
+            self._tickets[ticket_id] = (priority, ticket, time.time())
+
+        granted = ticket["event"].wait(wait)
+        if connection is not None and _disconnected(connection):
+            # Nobody is left to use or release the slot, or to poll the ticket
+            with self._lock:
+                owned = self._tickets.pop(ticket_id, None) is not None
+            if owned:
+                self.scheduler._withdraw(priority, ticket)
+            return None
+        with self._lock:
+            if ticket_id not in self._tickets:
+                # Expired meanwhile and already withdrawn; the next poll queues again
+                return {"ticket": ticket_id}
+            if not granted:
+                self._tickets[ticket_id] = (priority, ticket, time.time())
+                return {"ticket": ticket_id}
+            del self._tickets[ticket_id]
+            lease = str(next(self._ids))
+            self._leases[lease] = (priority, time.time())
+        return {"lease": lease, "wait": self.scheduler._granted(priority, ticket), "ttl": self.lease_ttl}
+
+    def _renew(self, lease):
+        with self._lock:
+            entry = self._leases.get(lease)
+            if entry:
+                self._leases[lease] = (entry[0], time.time())
+        return {"renewed": entry is not None}
+
+    def _release(self, lease):
+        with self._lock:
+            entry = self._leases.pop(lease, None)
+        if entry:
+            self.scheduler.release(entry[0])
+        return {"released": entry is not None}
+
+    def _reap(self):
+        while not self._stop.wait(self.lease_ttl / 3):
+            self._expire_leases()
+
+    def start(self):
+        """Start serving and expiring leases in background threads"""
+        threading.Thread(target=self._reap, name="scheduler-leases", daemon=True).start()
+        return super().start()
+
+    def stop(self):
+        """Stop the server"""
+        self._stop.set()
+        super().stop()
+
+
+def _disconnected(connection):
+    """True if the peer of a socket has closed it"""
+    try:
+        readable, _, _ = select.select([connection], [], [], 0)
+        return bool(readable) and not connection.recv(1, socket.MSG_PEEK)
+    except OSError:
+        return True
+
+
+@contextmanager
+def remote_slot(url, priority="normal", connect_timeout=3, poll_wait=20):
+    """
+    Hold a slot from a SchedulerServer for the duration of a with-block.
+
+    Waits in the scheduler's queue for as long as it takes, asking again
+    every poll_wait seconds. The lease is renewed in the background while
+    the block runs. Only if the scheduler cannot be reached at all does the
+    block run without a slot, rather than hanging.
+    """
+    url = url.rstrip("/")
+    params = {"priority": priority, "wait": poll_wait}
+    while True:
+        try:
+            response = requests.post(f"{url}/acquire", params=params,
+                                     timeout=(connect_timeout, poll_wait + connect_timeout))
+            response.raise_for_status()
+            grant = response.json()
+        except requests.ConnectionError as e:
+            print(f"⚠️  Scheduler at {url} unreachable, running without a slot: {e}", file=sys.stderr)
+            yield
+            return
+        except requests.Timeout:
+            # Connected but slow to answer: the scheduler is busy, so keep waiting
+            continue
+        if "lease" in grant:
+            break
+        params = {"priority": priority, "ticket": grant["ticket"], "wait": poll_wait}
+
+    lease = grant["lease"]
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(grant.get("ttl", 30) / 3):
+            try:
+                requests.post(f"{url}/renew", params={"lease": lease}, timeout=connect_timeout)
+            except requests.RequestException:
+                pass
+
+    threading.Thread(target=renew, name="scheduler-lease", daemon=True).start()
+    try:
+        yield
+    finally:
+        stop.set()
+        try:
+            requests.post(f"{url}/release", params={"lease": lease}, timeout=connect_timeout)
+        except requests.RequestException:
+            pass
+
+
+def env_slot(priority="normal"):
+    """Slot from the shared scheduler named by AI_VOICES_SCHEDULER_URL, or a no-op without one"""
+    url = os.environ.get("AI_VOICES_SCHEDULER_URL")
+    return remote_slot(url, priority) if url else nullcontext()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Incremental script rendering for AI Voices
+
+Splits a script into stable segments (paragraphs), renders only segments
+whose text, voice or settings changed since the previous build, and
+reassembles the final track from new and reused clips. Editing one
+sentence of a long script costs a single API call.
+
+Build state lives next to the script in <script>.build/:
+    manifest.json   - segment keys of the last successful build
+    <key>.mp3       - one clip per distinct segment
+"""
+import hashlib
+import json
+import os
+import re
+
+from audio import concat_mp3
+from preprocess import canonicalize
+from streaming import stream_jobs
+
+MAX_SEGMENT_CHARS = 5000
+MANIFEST_VERSION = 1
+_CLIP_KEY = re.compile(r"[0-9a-f]{24}")
+
+
+def split_segments(text, max_chars=MAX_SEGMENT_CHARS):
+    """
+    Split a script into segments.
+
+    Segments are paragraphs (separated by blank lines) in canonical form,
+    so re-wrapping a paragraph or retyping its quotes does not change it. Paragraphs
+    longer than max_chars are split at sentence boundaries.
+    """
+    segments = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = canonicalize(" ".join(paragraph.split()))
+        if not paragraph:
+            continue
+        while len(paragraph) > max_chars:
+            cut = max(paragraph.rfind(". ", 0, max_chars), paragraph.rfind("? ", 0, max_chars),
+                      paragraph.rfind("! ", 0, max_chars))
+            cut = cut + 1 if cut > 0 else max_chars
+            segments.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            segments.append(paragraph)
+    return segments
+
+
+def segment_key(text, settings):
+    """Content hash of a segment's text plus everything that affects its audio"""
+    data = json.dumps({"text": text, "settings": settings}, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()[:24]
+
+
+def load_manifest(build_dir):
+    """Return the manifest of the previous build (empty if none)"""
+    try:
+        with open(os.path.join(build_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "segments": []}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "segments": []}
+    return manifest
+
+
+def save_manifest(build_dir, manifest):
+    """Write the manifest atomically"""
+    path = os.path.join(build_dir, "manifest.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def build_script(script_path, settings, render, output_path=None, build_dir=None, max_in_flight=4):
+    """
+    Render a script incrementally.
+
+    Args:
+        script_path: Path of the script text file
+        settings: Dict of voice and generation settings (part of each segment key)
+        render: Callable(text, clip_path) that renders one segment to clip_path
+        output_path: Final track (default: the script path with .mp3)
+        build_dir: Build state directory (default: <script>.build)
+        max_in_flight: Maximum segments rendered at once
+
+    Returns:
+        dict: Summary with segments, reused, rendered, failed and output keys
+    """
+    with open(script_path, encoding="utf-8") as f:
+        segments = split_segments(f.read())
+
+    output_path = output_path or os.path.splitext(script_path)[0] + ".mp3"
+    build_dir = build_dir or script_path + ".build"
+    os.makedirs(build_dir, exist_ok=True)
+
+    previous = load_manifest(build_dir)
+    known = {entry["key"] for entry in previous["segments"]}
+
+    keys = [segment_key(text, settings) for text in segments]
+    clip_paths = {key: os.path.join(build_dir, f"{key}.mp3") for key in keys}
+
+    # Render each distinct new or changed segment once
+    todo = {}
+    for key, text in zip(keys, segments):
+        if key in known and os.path.exists(clip_paths[key]):
+            continue
+        todo.setdefault(key, text)
+
+    print(f"🧱 {len(segments)} segments: {len(segments) - sum(k in todo for k in keys)} unchanged, "
+          f"{len(todo)} to render\n")
+
+    def job(item):
+        key, text = item
+        partial_path = clip_paths[key] + ".part"
+        render(text, partial_path)
+        os.replace(partial_path, clip_paths[key])
+        return key
+
+    failed = []
+    for _, (key, _), _, error in stream_jobs(todo.items(), job, max_in_flight):
+        if error is not None:
+            failed.append(key)
+
+    # Record every segment whose clip exists, so a failed build still saves work
+    rendered = [key for key in todo if key not in failed]
+    save_manifest(build_dir, {
+        "version": MANIFEST_VERSION,
+        "script": os.path.basename(script_path),
+        "settings": settings,
+        "segments": [
+            {"key": key, "chars": len(text)}
+            for key, text in zip(keys, segments)
+            if os.path.exists(clip_paths[key])
+        ],
+    })
+
+    summary = {
+        "segments": len(segments),
+        "reused": len(segments) - sum(k in todo for k in keys),
+        "rendered": len(rendered),
+        "failed": len(failed),
+        "output": None,
+    }
+    if failed or not segments:
+        return summary
+
+    concat_mp3([clip_paths[key] for key in keys], output_path)
+    summary["output"] = output_path
+
+    # Drop clips of the previous build no longer referenced by the script. Only
+    # clip names the manifest recorded are touched, so the final track or other
+    # files sharing the build directory are never removed.
+    output = os.path.abspath(output_path)
+    for key in known - set(keys):
+        path = os.path.join(build_dir, f"{key}.mp3")
+        if _CLIP_KEY.fullmatch(key) and os.path.abspath(path) != output:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    return summary
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Streaming (Unix filter) mode for AI Voices
+
+Runs one text-to-speech job per input record with a bounded number of
+jobs in flight. Input is consumed lazily and results are yielded as soon
+as they can be emitted, so arbitrarily large streams run in constant memory.
+"""
+import json
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_END = object()
+
+
+def read_line_records(stream):
+    """Yield one record per non-blank input line"""
+    for line in stream:
+        text = line.rstrip("\n")
+        if text.strip():
+            yield {"text": text}
+
+
+def read_jsonl_records(stream):
+    """Yield one record per non-blank JSONL input line.
+
+    Each line is either a JSON object with a "text" key (plus optional
+    "voice" and "output") or a bare JSON string. Lines that fail to parse
+    are yielded with an "error" key so they still get an output record.
+    """
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {"text": "", "error": f"Invalid JSON: {e}"}
+            continue
+        if isinstance(record, str):
+            record = {"text": record}
+        if not isinstance(record, dict):
+            yield {"text": "", "error": "Record must be a JSON object or string"}
+            continue
+        yield record
+
+
+def stream_jobs(records, job_fn, max_in_flight=4, ordered=True, workers=None):
+    """
+    Run job_fn over records with at most max_in_flight jobs outstanding.
+
+    Args:
+        records: Iterable of records, consumed lazily
+        job_fn: Callable taking one record and returning its result, or a
+            Future of its result (the worker thread is then freed at once)
+        max_in_flight: Maximum number of jobs submitted but not yet yielded
+        ordered: Yield in input order (True) or completion order (False)
+        workers: Threads running job_fn (default: max_in_flight)
+
+    Yields:
+        tuple: (index, record, result, error) - error is None on success
+    """
+    max_in_flight = max(1, max_in_flight)
+    slots = threading.Semaphore(max_in_flight)
+    done = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=workers or max_in_flight)
+
+    def on_done(index, record, future):
+        # A job that returned a Future is only done when that Future is
+        if not future.cancelled() and future.exception() is None and isinstance(future.result(), Future):
+            future.result().add_done_callback(lambda inner: done.put((index, record, inner)))
+        else:
+            done.put((index, record, future))
+
+    def feed():
+        count = 0
+        try:
+            for index, record in enumerate(records):
+                # A slot is held from submission until the result is yielded,
+                # so out-of-order results never pile up beyond the window
+                slots.acquire()
+                future = executor.submit(job_fn, record)
+                future.add_done_callback(lambda f, i=index, r=record: on_done(i, r, f))
+                count += 1
+        except BaseException as e:
+            done.put((_END, count, e))
+            return
+        done.put((_END, count, None))
+
+    reader = threading.Thread(target=feed, name="stream-reader", daemon=True)
+    reader.start()
+
+    total = None
+    emitted = 0
+    pending = {}
+    next_index = 0
+
+    try:
+        while total is None or emitted < total:
+            index, record, future = done.get()
+
+            if index is _END:
+                total, read_error = record, future
+                if read_error is not None:
+                    raise read_error
+                continue
+
+            if ordered:
+                pending[index] = (record, future)
+                ready = []
+                while next_index in pending:
+                    ready.append((next_index, *pending.pop(next_index)))
+                    next_index += 1
+            else:
+                ready = [(index, record, future)]
+
+            for ready_index, ready_record, ready_future in ready:
+                if ready_future.cancelled():
+                    error, result = RuntimeError("Job was cancelled"), None
+                else:
+                    error = ready_future.exception()
+                    result = None if error else ready_future.result()
+                emitted += 1
+                slots.release()
+                yield ready_index, ready_record, result, error
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -15,12 +15,17 @@ from textual.widgets import (
     TextArea,
 )
 from textual.binding import Binding
-import subprocess
-import sys
 import os
+import threading
 
 # Import voice data from voices.py
 from voices import CUSTOM_VOICES, BUILTIN_VOICES, ALL_VOICE_IDS
+from previews import PreviewCache, previews_enabled, play_preview
+from client import SpeechClient, SpeechError, describe_event
+from prewarm import CDN_URLS, ConnectionWarmer
+from preprocess import TextPreprocessor, env_preprocessor
+from result_cache import env_cache
+from scheduler import env_slot
 
 
 class TextualTTSApp(App):
@@ -75,6 +80,14 @@ class TextualTTSApp(App):
         super().__init__()
         self.selected_voice = None
         self.text_content = ""
+        self.previews = PreviewCache()
+        self.cache = None
+        self.client = None
+        self.warmer = None
+        self.preview_warmer = None
+        self.job = None
+        # Status line shown under the voice list, or None while the panel shows a job
+        self._voice_message = "Ready! Select a voice, enter text, and press 'g' to generate."
 
     def compose(self) -> ComposeResult:
         """Create the UI layout"""
@@ -85,7 +98,7 @@ class TextualTTSApp(App):
             with Vertical(classes="voice-section"):
                 yield Label("🎤 Select Voice (by number)")
                 voice_input = Input(
-                    placeholder="Enter voice number (1-17)",
+                    placeholder="Enter voice number (1-17), or p<number> to preview",
                     id="voice-input"
                 )
                 yield voice_input
@@ -98,7 +111,7 @@ class TextualTTSApp(App):
             # Output with voice list
             with Vertical(classes="output-section"):
                 yield Label("📊 Status, Voice List & Output")
-                yield Static(self._format_voice_list() + "\n\n" + "Ready! Select a voice, enter text, and press 'g' to generate.", id="output-display")
+                yield Static(self._format_voice_list() + f"\n\n{self._voice_message}", id="output-display")
 
             # Generate Button
             yield Button("✨ Generate Speech", id="generate-btn", classes="generate-btn")
@@ -106,8 +119,45 @@ class TextualTTSApp(App):
         yield Footer()
 
     def on_mount(self) -> None:
-        """App is now running - nothing needed here for now"""
-        pass
+        """Warm voice previews and API connections in the background"""
+        self._ui_thread = threading.get_ident()
+        api_key = os.environ.get("FAL_KEY")
+        if api_key:
+            try:
+                preprocessor = env_preprocessor()
+            except (OSError, ValueError) as e:
+                self._show(f"❌ Pronunciation dictionary not loaded: {e}")
+                preprocessor = TextPreprocessor()
+            self.client = SpeechClient(api_key, job_slot=env_slot, preprocessor=preprocessor)
+            self.cache = env_cache(self.client.transport)
+            self.warmer = ConnectionWarmer(self.client.transport, [self.client.queue_url, *CDN_URLS]).start()
+        if api_key and previews_enabled():
+            self.preview_warmer = self.previews.warm(api_key, on_ready=self._on_preview_ready)
+
+    def on_unmount(self) -> None:
+        """Cancel a running job and stop warming previews and connections"""
+        if self.job:
+            self.job.cancel()
+        if self.preview_warmer:
+            self.preview_warmer.cancel()
+        if self.warmer:
+            self.warmer.stop()
+
+    def _on_preview_ready(self, voice_id, path):
+        """Called from the warm-up thread when a preview finishes"""
+        if path:
+            self._on_ui_thread(self.log, f"Preview ready: {voice_id}")
+            self._on_ui_thread(self._refresh_voice_list)
+
+    def _refresh_voice_list(self):
+        """Redraw the voice list (and its 🔊 markers) if the panel is showing it"""
+        if self._voice_message is not None:
+            self._show_voices(self._voice_message)
+
+    def _show_voices(self, message):
+        """Show the voice list with a status message under it"""
+        self._voice_message = message
+        self.query_one("#output-display", Static).update(self._format_voice_list() + f"\n\n{message}")
 
     def _format_voice_list(self):
         """Format the voice list for display"""
@@ -118,22 +168,48 @@ class TextualTTSApp(App):
         if CUSTOM_VOICES:
             lines.append("CUSTOM VOICES:")
             for voice_id, display_name in CUSTOM_VOICES.items():
-                lines.append(f"{option_num}. {display_name} ({voice_id})")
+                lines.append(f"{option_num}. {display_name} ({voice_id}){self._preview_marker(voice_id)}")
                 option_num += 1
             lines.append("")
 
         # Built-in voices
         lines.append("BUILT-IN VOICES:")
         for voice in BUILTIN_VOICES:
-            lines.append(f"{option_num}. {voice}")
+            lines.append(f"{option_num}. {voice}{self._preview_marker(voice)}")
             option_num += 1
 
         return "\n".join(lines)
 
+    def _preview_marker(self, voice_id):
+        """Mark voices that have a cached preview"""
+        return " 🔊" if self.previews.get(voice_id) else ""
+
+    def _handle_preview(self, value: str):
+        """Play the cached preview for 'p<number>'"""
+        voice_ids = list(CUSTOM_VOICES) + BUILTIN_VOICES
+        try:
+            voice_id = voice_ids[int(value[1:]) - 1]
+        except (ValueError, IndexError):
+            message = f"❌ Invalid preview choice: '{value}'"
+        else:
+            display_name = CUSTOM_VOICES.get(voice_id, voice_id)
+            path = self.previews.get(voice_id)
+            if not path:
+                message = f"⏳ No preview cached for {display_name} yet"
+            elif play_preview(path):
+                message = f"🔊 Playing preview of {display_name}"
+            else:
+                message = f"🔊 Preview of {display_name}: {path}"
+        self._show_voices(message)
+
     def on_input_submitted(self, event: Input.Submitted) -> None:
         """Handle voice input submission"""
         if event.input.id == "voice-input":
-            self._handle_voice_selection(event.value)
+            value = event.value.strip().lower()
+            if value.startswith("p"):
+                self._handle_preview(value)
+            else:
+                self._handle_voice_selection(event.value)
 
     def _handle_voice_selection(self, value: str):
         """Handle voice selection by number"""
@@ -145,8 +221,7 @@ class TextualTTSApp(App):
             for voice_id, display_name in CUSTOM_VOICES.items():
                 if choice == option_num:
                     self.selected_voice = voice_id
-                    display = self._format_voice_list() + f"\n\n✅ Selected: {display_name} ({voice_id})\nPress 'g' to generate!"
-                    self.query_one("#output-display", Static).update(display)
+                    self._show_voices(f"✅ Selected: {display_name} ({voice_id})\nPress 'g' to generate!")
                     return
                 option_num += 1
 
@@ -154,18 +229,15 @@ class TextualTTSApp(App):
             for voice in BUILTIN_VOICES:
                 if choice == option_num:
                     self.selected_voice = voice
-                    display = self._format_voice_list() + f"\n\n✅ Selected: {voice}\nPress 'g' to generate!"
-                    self.query_one("#output-display", Static).update(display)
+                    self._show_voices(f"✅ Selected: {voice}\nPress 'g' to generate!")
                     return
                 option_num += 1
 
             # Invalid choice
-            display = self._format_voice_list() + f"\n\n❌ Invalid choice: {choice}\nPlease enter a number between 1 and {option_num - 1}"
-            self.query_one("#output-display", Static).update(display)
+            self._show_voices(f"❌ Invalid choice: {choice}\nPlease enter a number between 1 and {option_num - 1}")
 
         except ValueError:
-            display = self._format_voice_list() + f"\n\n❌ Invalid input: '{value}'\nPlease enter a number (1-17)"
-            self.query_one("#output-display", Static).update(display)
+            self._show_voices(f"❌ Invalid input: '{value}'\nPlease enter a number (1-17)")
 
     def on_text_area_changed(self, event: TextArea.Changed) -> None:
         """Handle text input"""
@@ -181,46 +253,78 @@ class TextualTTSApp(App):
             self.generate_speech()
 
     def generate_speech(self) -> None:
-        """Generate speech using the CLI version"""
+        """Start a generation job in the background; progress updates the output panel"""
         if not self.selected_voice:
-            self.query_one("#output-display", Static).update(
+            self._show(
                 "❌ Please select a voice first! (Enter a number in the voice field)"
             )
             return
 
         if not self.text_content.strip():
-            self.query_one("#output-display", Static).update(
+            self._show(
                 "❌ Please enter some text first!"
             )
             return
 
-        api_key = os.environ.get("FAL_KEY")
-        if not api_key:
-            self.query_one("#output-display", Static).update(
+        if not self.client:
+            self._show(
                 "❌ Please set FAL_KEY environment variable\n\n"
                 "export FAL_KEY='your-api-key-here'"
             )
             return
 
-        output = self.query_one("#output-display", Static)
-        output.update("🚀 Generating speech...\n\n")
+        if self.job and not self.job.done():
+            self._show(
+                "⏳ Still generating the previous request..."
+            )
+            return
+
+        self._show("🚀 Generating speech...\n\n")
         self.log(f"Generating with voice: {self.selected_voice}")
         self.log(f"Text: {self.text_content[:50]}...")
 
+        self.job = self.client.submit(
+            self.text_content,
+            self.selected_voice,
+            display_name=CUSTOM_VOICES.get(self.selected_voice, self.selected_voice),
+            cache=self.cache,
+            on_progress=self._on_progress,
+            priority="interactive",
+        )
+        self.job.add_done_callback(self._on_job_done)
+
+    def _show(self, message):
+        """Update the output panel (replacing the voice list) from the UI thread or a job thread"""
+        self._voice_message = None
+        self._on_ui_thread(self.query_one("#output-display", Static).update, message)
+
+    def _on_ui_thread(self, callback, *args):
+        """Run callback on the UI thread, directly if already there"""
+        if threading.get_ident() == self._ui_thread:
+            callback(*args)
+        else:
+            self.call_from_thread(callback, *args)
+
+    def _on_progress(self, event):
+        """Called from the job's thread for every progress event"""
+        if event["event"] == "downloading" and self.warmer:
+            # Keep the host results really come from warm for the next job
+            self.warmer.add(event["url"])
+        description = describe_event(event)
+        if description:
+            self._show(f"🚀 {description}\n\n")
+
+    def _on_job_done(self, job):
+        """Called when the job finishes (from its thread, or right away if it already has)"""
+        if job.cancelled:
+            return
         try:
-            result = subprocess.run(
-                [sys.executable, "main.py", "--voice", self.selected_voice, "--text", self.text_content],
-                capture_output=True,
-                text=True,
-                env={**os.environ, "FAL_KEY": api_key},
-            )
-
-            if result.returncode == 0:
-                output.update(f"✅ Success!\n\n{result.stdout}")
-            else:
-                output.update(f"❌ Generation failed:\n\n{result.stderr}")
+            message = f"✅ Success!\n\n🎉 Your audio file is ready at: {job.result()}"
+        except (SpeechError, ValueError) as e:
+            message = f"❌ Generation failed:\n\n{e}"
         except Exception as e:
-            output.update(f"❌ Error: {str(e)}")
+            message = f"❌ Error: {str(e)}"
+        self._show(message)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Opt-in Chrome trace-event recorder for AI Voices
+
+Records one span per job per stage (submit, status poll, result fetch,
+download, post-processing) with thread IDs, and writes Chrome trace-event
+JSON that opens in https://ui.perfetto.dev or chrome://tracing.
+
+Tracing is off unless enable() is called. While it is off, span() and
+job() return a shared no-op context manager, so the hooks can stay in
+production code.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_NULL = nullcontext()
+_recorder = None
+_local = threading.local()
+
+
+class TraceRecorder:
+    """Collects complete ("X") trace events in memory"""
+
+    def __init__(self):
+        self.events = []
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._threads = {}
+        self._origin = time.perf_counter()
+
+    def now_us(self):
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def add(self, name, start_us, end_us, category, args):
+        tid = threading.get_ident()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start_us,
+            "dur": end_us - start_us,
+            "pid": self.pid,
+            "tid": tid,
+            "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+            self._threads.setdefault(tid, threading.current_thread().name)
+
+    def to_json(self):
+        """Return the trace as a Chrome trace-event document"""
+        with self._lock:
+            metadata = [
+                {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self._threads.items()
+            ]
+            return {"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms"}
+
+    def save(self, path):
+        """Write the trace to a JSON file"""
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f)
+
+
+def enable():
+    """Start recording. Returns the recorder."""
+    global _recorder
+    _recorder = TraceRecorder()
+    return _recorder
+
+
+def disable():
+    """Stop recording. Returns the recorder that was active, if any."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def enabled():
+    return _recorder is not None
+
+
+@contextmanager
+def _span(recorder, name, category, args):
+    job = getattr(_local, "job", None)
+    if job is not None:
+        args = {"job": job, **args}
+    start = recorder.now_us()
+    try:
+        yield
+    finally:
+        recorder.add(name, start, recorder.now_us(), category, args)
+
+
+def span(name, category="stage", **args):
+    """Context manager recording one span (no-op while tracing is off)"""
+    if _recorder is None:
+        return _NULL
+    return _span(_recorder, name, category, args)
+
+
+@contextmanager
+def _job(recorder, label):
+    previous = getattr(_local, "job", None)
+    _local.job = label
+    try:
+        with _span(recorder, "job", "job", {}):
+            yield
+    finally:
+        _local.job = previous
+
+
+def job(label):
+    """Label every span in this thread with a job name and record a job span"""
+    if _recorder is None:
+        return _NULL
+    return _job(_recorder, label)
+
+
+@contextmanager
+def _labelled(label):
+    previous = getattr(_local, "job", None)
+    _local.job = label
+    try:
+        yield
+    finally:
+        _local.job = previous
+
+
+def labelled(label):
+    """Label every span in this thread with a job name, without recording a job span"""
+    if _recorder is None or label is None:
+        return _NULL
+    return _labelled(label)
+
+
+def traced(name):
+    """Decorator recording a span around each call of a function"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with _span(_recorder, name, "stage", {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
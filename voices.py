@@ -109,11 +109,18 @@ def list_voices():
     print(f"Total: {len(CUSTOM_VOICES)} custom + {len(BUILTIN_VOICES)} built-in = {len(ALL_VOICE_IDS)} voices\n")
 
 
-def select_voice_interactive():
+def select_voice_interactive(previews=None):
     """
     Interactive voice selection menu.
     Returns the selected voice ID.
+
+    Args:
+        previews: Optional PreviewCache (see previews.py). Voices with a
+            cached preview are marked, and 'p<number>' plays one.
     """
+    def marker(voice_id):
+        return " 🔊" if previews and previews.get(voice_id) else ""
+
     print("\n" + "=" * 60)
     print("🎤 SELECT A VOICE")
     print("=" * 60)
@@ -125,7 +132,7 @@ def select_voice_interactive():
     if CUSTOM_VOICES:
         print("\n📌 Custom Voices:")
         for voice_id, display_name in CUSTOM_VOICES.items():
-            print(f"  {option_num}. {display_name}")
+            print(f"  {option_num}. {display_name}{marker(voice_id)}")
             print(f"     (ID: {voice_id})")
             voice_options.append(voice_id)
             option_num += 1
@@ -135,13 +142,15 @@ def select_voice_interactive():
     # List built-in voices
     print("\n📌 Built-in Voices:")
     for voice in BUILTIN_VOICES:
-        print(f"  {option_num}. {voice}")
+        print(f"  {option_num}. {voice}{marker(voice)}")
         voice_options.append(voice)
         option_num += 1
 
     print(f"\n{'-' * 60}")
     print(f"Total: {len(voice_options)} voices available")
     print(f"{'-' * 60}")
+    if previews:
+        print("🔊 = preview cached. Enter 'p<number>' (e.g. p3) to hear a voice first.")
     print("\nEnter the number of your choice (or 'q' to quit): ", end="")
 
     import sys
@@ -154,6 +163,14 @@ def select_voice_interactive():
                 print("\n❌ Cancelled by user")
                 sys.exit(0)
 
+            # Preview request, e.g. "p3"
+            if previews and choice.startswith("p") and choice[1:].strip().isdigit():
+                preview_num = int(choice[1:])
+                if 1 <= preview_num <= len(voice_options):
+                    _preview_voice(previews, voice_options[preview_num - 1])
+                print("Enter the number of your choice (or 'q' to quit): ", end="")
+                continue
+
             # Try to convert to number
             choice_num = int(choice)
 
@@ -171,3 +188,17 @@ def select_voice_interactive():
         except (EOFError, KeyboardInterrupt):
             print("\n\n❌ Cancelled by user")
             sys.exit(0)
+
+
+def _preview_voice(previews, voice_id):
+    """Play (or point to) the cached preview of a voice"""
+    from previews import play_preview
+
+    display_name = CUSTOM_VOICES.get(voice_id, voice_id)
+    path = previews.get(voice_id)
+    if not path:
+        print(f"⏳ No preview cached for {display_name} yet")
+    elif play_preview(path):
+        print(f"🔊 Playing preview of {display_name}")
+    else:
+        print(f"🔊 Preview of {display_name}: {path}")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Local webhook receiver for AI Voices
+
+Jobs submitted with a fal_webhook URL pointing at this receiver are woken
+as soon as fal.ai posts their completion event, instead of polling the
+status URL every few seconds.
+
+The receiver only listens on 127.0.0.1 unless it is given a public URL.
+Its URL ends in a random token, and only events for request IDs this
+process is waiting on are ever handed to a job, so other hosts cannot
+feed it results.
+"""
+import json
+import secrets
+import threading
+from collections import OrderedDict
+
+from local_server import LocalServer, QuietHandler
+
+WEBHOOK_PATH = "/fal-webhook"
+
+# Events for request IDs nobody has claimed yet (a webhook may beat the
+# submit response); the oldest are dropped beyond this many
+MAX_UNCLAIMED = 256
+
+
+class WebhookReceiver(LocalServer):
+    """
+    Small HTTP server that collects fal.ai webhook events by request ID.
+
+    Events that arrive before anyone waits for them are kept, so there is
+    no race between submitting a job and starting to wait for it.
+
+    Args:
+        host: Bind address (default: 127.0.0.1, or every interface with a public_url)
+        port: Port (default: any free port)
+        public_url: Address that forwards to the receiver, e.g. a tunnel; the
+            receiver's token is appended to it
+    """
+
+    thread_name = "webhook-receiver"
+
+    def __init__(self, host=None, port=0, public_url=None):
+        self._lock = threading.Lock()
+        self._events = {}
+        self._payloads = {}
+        self._expected = set()
+        self._unclaimed = OrderedDict()
+        self.token = secrets.token_urlsafe(24)
+
+        receiver = self
+
+        class Handler(QuietHandler):
+            def do_POST(self):
+                # Only the URL handed to fal.ai carries the token
+                if self.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1] != receiver.token:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                try:
+                    event = json.loads(body or b"{}")
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+
+                request_id = event.get("request_id") if isinstance(event, dict) else None
+                if not request_id:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+
+                receiver.deliver(request_id, event)
+                self.send_response(200)
+                self.end_headers()
+
+        if host is None:
+            host = "0.0.0.0" if public_url else "127.0.0.1"
+        self._serve(Handler, host, port)
+
+        bound_host, bound_port = self._server.server_address[:2]
+        if public_url:
+            self.url = f"{public_url.rstrip('/')}/{self.token}"
+        else:
+            if bound_host in ("0.0.0.0", ""):
+                bound_host = "127.0.0.1"
+            self.url = f"http://{bound_host}:{bound_port}{WEBHOOK_PATH}/{self.token}"
+
+    def _event_for(self, request_id):
+        with self._lock:
+            event = self._events.get(request_id)
+            if event is None:
+                event = self._events[request_id] = threading.Event()
+            return event
+
+    def expect(self, request_id):
+        """Accept webhooks for a request this process submitted"""
+        with self._lock:
+            self._expected.add(request_id)
+            payload = self._unclaimed.pop(request_id, None)
+        if payload is not None:
+            self.deliver(request_id, payload)
+
+    def deliver(self, request_id, payload):
+        """Record a completion event and wake its waiter, if the request is expected"""
+        with self._lock:
+            if request_id not in self._expected:
+                self._unclaimed[request_id] = payload
+                while len(self._unclaimed) > MAX_UNCLAIMED:
+                    self._unclaimed.popitem(last=False)
+                return
+            self._payloads[request_id] = payload
+        self._event_for(request_id).set()
+
+    def wait(self, request_id, timeout=None):
+        """
+        Wait for the webhook of a request.
+
+        Returns:
+            dict or None: The webhook body, or None if it did not arrive in time
+        """
+        if not self._event_for(request_id).wait(timeout):
+            return None
+        return self.pop(request_id)
+
+    def pop(self, request_id):
+        """Remove and return a delivered webhook body, if any, and stop expecting the request"""
+        with self._lock:
+            self._events.pop(request_id, None)
+            self._expected.discard(request_id)
+            return self._payloads.pop(request_id, None)